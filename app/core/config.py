@@ -2,16 +2,27 @@
 应用配置
 支持从环境变量读取
 """
-from pydantic_settings import BaseSettings
-from typing import Optional
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import List, Optional
+import os
 
 
 class Settings(BaseSettings):
+    # Vercel环境变量由平台注入，跳过.env文件读取以缩短冷启动
+    model_config = SettingsConfigDict(
+        env_file=None if os.getenv("VERCEL") else ".env",
+        case_sensitive=True,
+    )
+    
     # 应用配置
     APP_NAME: str = "KKAPI"
     VERSION: str = "0.0.1"
     DEBUG: bool = False
     
+    # CORS配置，生产环境建议配置具体域名，例如 ["https://example.com"]
+    CORS_ORIGINS: List[str] = ["*"]
+    
     # 数据库配置
     DATABASE_URL: str
     DATABASE_NAME: str = "kkapi"
@@ -23,19 +34,27 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 43200  # 30天
     
+    # 密码加密配置
+    # bcrypt成本因子，每次计算执行 2^rounds 轮Eksblowfish，每+1耗时翻倍
+    BCRYPT_ROUNDS: int = 10
+    
     # MongoDB连接池配置（Serverless优化）
     MONGO_MAX_POOL_SIZE: int = 10
     MONGO_MIN_POOL_SIZE: int = 1
     MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_MAX_IDLE_TIME_MS: int = 30000       # 空闲连接回收时间
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000   # 连接池耗尽时的最长等待时间
     
     # GitHub OAuth配置（可选）
     GITHUB_CLIENT_ID: Optional[str] = None
     GITHUB_CLIENT_SECRET: Optional[str] = None
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """获取全局唯一的配置实例"""
+    return Settings()
+
+
+settings = get_settings()
 
@@ -2,20 +2,43 @@
 FastAPI依赖注入
 用于替代NestJS的装饰器系统
 """
-from typing import Optional
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from typing import Any, NamedTuple, Optional
+from fastapi import Depends, Header, HTTPException, status
 
 from app.core.security import verify_token
 from app.database import get_db_async
 
-# HTTP Bearer认证
-security = HTTPBearer()
-security_optional = HTTPBearer(auto_error=False)
+
+async def raw_bearer_token(
+    authorization: Optional[str] = Header(None)
+) -> Optional[str]:
+    """
+    从Authorization请求头中提取Bearer token
+    直接解析字符串，省去HTTPBearer构造HTTPAuthorizationCredentials模型
+    
+    Returns:
+        token字符串，未提供或格式不正确时返回None
+    """
+    if not authorization:
+        return None
+    
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    
+    return token
+
+
+def _user_from_payload(payload: dict) -> dict:
+    """从JWT payload中提取用户信息"""
+    return {
+        "userId": payload.get("userId"),
+        "userName": payload.get("userName")
+    }
 
 
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    token: Optional[str] = Depends(raw_bearer_token)
 ) -> dict:
     """
     获取当前用户（必须登录）
@@ -27,17 +50,17 @@ async def get_current_user(
             "userName": "用户名"
         }
     """
-    token = credentials.credentials
-    payload = verify_token(token)
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authenticated"
+        )
     
-    return {
-        "userId": payload.get("userId"),
-        "userName": payload.get("userName")
-    }
+    return _user_from_payload(verify_token(token))
 
 
 async def get_current_user_optional(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional)
+    token: Optional[str] = Depends(raw_bearer_token)
 ) -> Optional[dict]:
     """
     获取当前用户（可选登录）
@@ -47,16 +70,11 @@ async def get_current_user_optional(
         登录: {"userId": "...", "userName": "..."}
         未登录: None
     """
-    if not credentials:
+    if token is None:
         return None
     
     try:
-        token = credentials.credentials
-        payload = verify_token(token)
-        return {
-            "userId": payload.get("userId"),
-            "userName": payload.get("userName")
-        }
+        return _user_from_payload(verify_token(token))
     except HTTPException:
         return None
 
@@ -69,8 +87,31 @@ async def get_db():
     return await get_db_async()
 
 
+class AuthContext(NamedTuple):
+    """当前用户与数据库连接"""
+    user: dict
+    db: Any
+
+
+async def auth_and_db(
+    token: Optional[str] = Depends(raw_bearer_token)
+) -> AuthContext:
+    """
+    获取当前用户（必须登录）和数据库连接
+    合并为一个依赖，减少每个请求的依赖解析次数
+    
+    Returns:
+        AuthContext(user, db)，可直接解包: current_user, db = auth
+    """
+    return AuthContext(
+        await get_current_user(token),
+        await get_db_async()
+    )
+
+
 # 导出常用依赖
 CurrentUser = Depends(get_current_user)
 CurrentUserOptional = Depends(get_current_user_optional)
 Database = Depends(get_db)
+CurrentUserAndDb = Depends(auth_and_db)
 
@@ -0,0 +1,40 @@
+"""
+共享HTTP客户端
+复用连接池与TLS会话，采用与数据库相同的惰性初始化策略
+"""
+from typing import TYPE_CHECKING, Optional
+
+# httpx在首次使用时才导入，未发起外部请求的实例无需承担其导入耗时
+if TYPE_CHECKING:
+    import httpx
+
+# 全局客户端对象
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """
+    获取共享的HTTP客户端
+    首次调用时创建，之后的请求复用已建立的连接
+    """
+    global _client
+    
+    if _client is None or _client.is_closed:
+        import httpx
+        
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    
+    return _client
+
+
+async def close_http_client():
+    """
+    关闭共享的HTTP客户端
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
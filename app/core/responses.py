@@ -0,0 +1,35 @@
+"""
+响应类
+基于orjson的JSON响应，替代FastAPI默认的json.dumps
+"""
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+
+
+def _default(obj: Any) -> Any:
+    """orjson无法原生序列化的类型"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为JSON字节串，ORJSONResponse与流式响应共用"""
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS,
+    )
+
+
+class ORJSONResponse(_ORJSONResponse):
+    """
+    使用orjson序列化的JSON响应
+    支持非字符串键，并将ObjectId序列化为字符串
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
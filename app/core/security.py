@@ -1,18 +1,65 @@
 """
 安全相关：JWT、密码加密
 """
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from datetime import timedelta
+from typing import Optional, Dict, Any, Tuple
+import jwt
+from jwt import InvalidTokenError as JWTError
 from fastapi import HTTPException, status
+import base64
 import hashlib
+import hmac
+import logging
+import re
+import ssl
+import time
 import bcrypt
+import orjson
 
 from app.core.config import settings
+from app.utils.cache import TTLCache
 
-# 密码加密上下文（bcrypt，与NestJS兼容）
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# JWT配置在导入时绑定为模块常量，避免每次编解码都访问settings
+_SECRET_KEY = settings.SECRET_KEY
+_ALGORITHM = settings.ALGORITHM
+_ALGORITHMS = [settings.ALGORITHM]
+_EXPIRE_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+# HMAC算法对应的摘要函数，用于快速签发token
+_HMAC_DIGESTS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+
+def _b64url(data: bytes) -> bytes:
+    """base64url编码（去除填充）"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# 签发token时的固定部分：密钥字节、摘要函数、已编码的JWT头
+# 与PyJWT生成的头一致：{"alg":"HS256","typ":"JWT"}
+_SECRET_KEY_BYTES = _SECRET_KEY.encode('utf-8')
+_HMAC_DIGEST = _HMAC_DIGESTS.get(_ALGORITHM)
+_HEADER_B64 = _b64url(orjson.dumps({"alg": _ALGORITHM, "typ": "JWT"}))
+
+# hashlib.sha256 由OpenSSL实现（支持时自动使用SHA-NI指令）
+_sha256 = hashlib.sha256
+if not _sha256.__name__.startswith("openssl_"):
+    logger.warning("hashlib.sha256 未使用OpenSSL实现: %s", _sha256.__name__)
+else:
+    logger.debug("hashlib.sha256 使用 %s", ssl.OPENSSL_VERSION)
+
+# bcrypt哈希格式：$2a$/$2b$/$2y$ + 两位cost + 22位salt和31位哈希
+_BCRYPT_HASH_MATCH = re.compile(r"\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}").fullmatch
+
+# JWT解码结果缓存：token -> payload
+# 条目最长缓存60秒，且不会超过token自身的过期时间
+_TOKEN_CACHE_TTL = 60
+_token_cache = TTLCache(maxsize=4096, ttl=_TOKEN_CACHE_TTL)
 
 
 def _preprocess_password(password: str) -> str:
@@ -24,8 +71,11 @@ def _preprocess_password(password: str) -> str:
     
     Returns:
         SHA256哈希后的十六进制字符串
+    
+    注意：这里有意不做结果缓存（如lru_cache），缓存键会让明文密码常驻进程内存，
+    而单次SHA256仅微秒级，相比bcrypt可以忽略
     """
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+    return _sha256(password.encode('utf-8')).hexdigest()
 
 
 def hash_password(password: str) -> str:
@@ -40,41 +90,90 @@ def hash_password(password: str) -> str:
     """
     # 先使用SHA256预处理，避免bcrypt 72字节限制
     preprocessed = _preprocess_password(password)
-    return pwd_context.hash(preprocessed)
+    # 直接调用bcrypt，省去passlib的方案分发开销
+    return bcrypt.hashpw(preprocessed.encode('utf-8'), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode('utf-8')
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def is_password_hash(value: str) -> bool:
     """
-    验证密码（兼容NestJS的bcrypt格式）
+    判断字符串是否已是bcrypt密码哈希
+    
+    Args:
+        value: 待判断的字符串
+    
+    Returns:
+        是否为完整的bcrypt哈希
+    """
+    return _BCRYPT_HASH_MATCH(value) is not None
+
+
+def _check_password(plain_password: str, hashed_password: str) -> Tuple[bool, bool]:
+    """
+    校验密码
     
     Args:
         plain_password: 明文密码
         hashed_password: bcrypt加密后的密码哈希
     
     Returns:
-        密码是否匹配
+        (是否匹配, 是否按NestJS旧格式匹配)
     """
+    # 验证输入参数
+    if not plain_password or not hashed_password:
+        logger.debug("密码验证失败: 密码或哈希为空")
+        return False, False
+    
     try:
-        # 验证输入参数
-        if not plain_password or not hashed_password:
-            print(f"❌ 密码验证失败: 密码或哈希为空")
-            return False
-        
-        # 直接使用 bcrypt.checkpw
-        password_bytes = plain_password.encode('utf-8')
         hash_bytes = hashed_password.encode('utf-8')
-        result = bcrypt.checkpw(password_bytes, hash_bytes)
         
-        return result
-    except UnicodeDecodeError as e:
-        print(f"❌ 密码验证失败 - 编码错误: {e}")
-        return False
-    except ValueError as e:
-        print(f"❌ 密码验证失败 - 值错误: {e}")
-        return False
-    except Exception as e:
-        print(f"❌ 密码验证失败 - 未知错误: {type(e).__name__}: {e}")
-        return False
+        # 与 hash_password 一致，先做SHA256预处理
+        preprocessed = _preprocess_password(plain_password).encode('utf-8')
+        if bcrypt.checkpw(preprocessed, hash_bytes):
+            return True, False
+        
+        # 兼容NestJS生成的旧哈希（未经SHA256预处理），$2a$/$2b$前缀都可能出现；
+        # 匹配后由调用方重新哈希，下次登录不再走这条路径
+        if bcrypt.checkpw(plain_password.encode('utf-8'), hash_bytes):
+            return True, True
+        
+        return False, False
+    except (ValueError, TypeError) as e:
+        # 哈希格式无效（如salt损坏）或编码错误（UnicodeError是ValueError的子类）
+        logger.debug("密码验证失败: %s: %s", type(e).__name__, e)
+        return False, False
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    验证密码（兼容NestJS的bcrypt格式）
+    优先按 hash_password 的SHA256预处理格式验证，失败后再按NestJS原始格式验证
+    
+    Args:
+        plain_password: 明文密码
+        hashed_password: bcrypt加密后的密码哈希
+    
+    Returns:
+        密码是否匹配
+    """
+    return _check_password(plain_password, hashed_password)[0]
+
+
+def verify_password_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    验证密码，按旧格式验证通过时同时生成新格式的哈希
+    调用方保存新哈希后，该用户之后的登录只需一次bcrypt校验
+    
+    Args:
+        plain_password: 明文密码
+        hashed_password: bcrypt加密后的密码哈希
+    
+    Returns:
+        (密码是否匹配, 需要保存的新哈希；无需更新时为None)
+    """
+    matched, legacy = _check_password(plain_password, hashed_password)
+    if matched and legacy:
+        return True, hash_password(plain_password)
+    return matched, None
 
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -87,30 +186,46 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     """
     to_encode = data.copy()
     
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # 直接使用整数时间戳作为exp，省去datetime对象的构造与转换
+    to_encode["exp"] = int(time.time()) + (
+        int(expires_delta.total_seconds()) if expires_delta else _EXPIRE_SECONDS
+    )
+    
+    # 非HMAC算法交给PyJWT处理
+    if _HMAC_DIGEST is None:
+        return jwt.encode(to_encode, _SECRET_KEY, algorithm=_ALGORITHM)
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    # HMAC算法：复用预编码的JWT头，直接计算签名
+    signing_input = _HEADER_B64 + b"." + _b64url(orjson.dumps(to_encode))
+    signature = hmac.new(_SECRET_KEY_BYTES, signing_input, _HMAC_DIGEST).digest()
     
-    return encoded_jwt
+    return (signing_input + b"." + _b64url(signature)).decode("ascii")
 
 
 def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
     """
     解码JWT Token
+    优先读取缓存，避免同一token在每次请求中重复验签和解析
     
     Returns:
         解码后的payload，包含 userId 和 userName
         失败返回 None
     """
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    payload = _token_cache.get(token)
+    if payload is not None:
         return payload
+    
+    try:
+        payload = jwt.decode(token, _SECRET_KEY, algorithms=_ALGORITHMS)
     except JWTError:
         return None
+    
+    # 缓存时间不超过token剩余有效期
+    exp = payload.get("exp")
+    ttl = _TOKEN_CACHE_TTL if exp is None else min(exp - time.time(), _TOKEN_CACHE_TTL)
+    _token_cache.set(token, payload, ttl)
+    
+    return payload
 
 
 def verify_token(token: str) -> Dict[str, Any]:
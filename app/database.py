@@ -3,75 +3,115 @@ MongoDB数据库连接
 优化Serverless环境的连接复用
 """
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional
+from typing import Any, Dict, Optional, Set
 import asyncio
+import logging
 
 from app.core.config import settings
 
 # 全局连接对象
 _client: Optional[AsyncIOMotorClient] = None
 _db = None
-_initializing = False
+_init_lock = asyncio.Lock()
+_index_task: Optional[asyncio.Task] = None
+
+# 唯一索引已全部创建成功的集合
+# 在此之前（索引创建中或因已有重复数据而失败）写入时仍需先查询判重
+_unique_ready: Set[str] = set()
+
+logger = logging.getLogger(__name__)
+
+# 集合句柄缓存，避免每次 db[name] 都重新构造集合对象
+_collections: Dict[str, Any] = {}
+_collections_db = None
+
+
+def _create_client() -> AsyncIOMotorClient:
+    """
+    创建MongoDB客户端
+    连接池参数见 settings.MONGO_*，整个进程共用一个客户端
+    """
+    return AsyncIOMotorClient(
+        settings.DATABASE_URL,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        # Serverless优化配置
+        connectTimeoutMS=10000,  # 连接超时
+        socketTimeoutMS=10000,   # socket超时
+        retryWrites=True,        # 自动重试写操作
+    )
+
+
+async def _ensure_indexes(db):
+    """
+    创建查询所需的索引（见 _INDEXES）
+    索引已存在时MongoDB直接返回，可重复执行；单个索引失败不影响其他索引
+    """
+    unique_failed = set()
+    for name, keys, options in _INDEXES:
+        try:
+            await db[name].create_index(keys, **options)
+        except Exception:
+            if options.get("unique"):
+                unique_failed.add(name)
+                logger.exception("创建唯一索引失败，%s 写入时将继续查询判重，请清理重复数据: %s", name, keys)
+            else:
+                logger.exception("创建索引失败: %s %s", name, keys)
+    
+    _unique_ready.update(
+        name for name, _, options in _INDEXES
+        if options.get("unique") and name not in unique_failed
+    )
+
+
+def unique_index_ready(name: str) -> bool:
+    """
+    集合的唯一索引是否已全部创建成功
+    未就绪时调用方需要自行查询判重，不能只依赖DuplicateKeyError
+    
+    Args:
+        name: 集合名称，见 Collections
+    """
+    return name in _unique_ready
 
 
 async def ensure_connection():
     """
     确保数据库连接可用
-    使用锁机制防止并发初始化
+    使用 asyncio.Lock + 双重检查防止并发初始化
     """
-    global _client, _db, _initializing
+    global _client, _db
     
-    # 如果已经有连接，直接返回
+    # 如果已经有连接，直接返回（无锁快速路径）
     if _client is not None and _db is not None:
         return _db
     
-    # 防止并发初始化
-    if _initializing:
-        # 等待其他协程完成初始化
-        max_wait = 30  # 最多等待30秒
-        waited = 0
-        while _initializing and waited < max_wait:
-            await asyncio.sleep(0.1)
-            waited += 0.1
-        
-        if _db is not None:
+    async with _init_lock:
+        # 获得锁后再次检查，其他协程可能已完成初始化
+        if _client is not None and _db is not None:
             return _db
-    
-    try:
-        _initializing = True
-        
-        # 创建新连接
-        _client = AsyncIOMotorClient(
-            settings.DATABASE_URL,
-            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
-            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
-            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
-            # Serverless优化配置
-            connectTimeoutMS=10000,  # 连接超时
-            socketTimeoutMS=10000,   # socket超时
-            retryWrites=True,        # 自动重试写操作
-        )
-        _db = _client[settings.DATABASE_NAME]
-        
-        # 测试连接（使用较短的超时）
-        await asyncio.wait_for(
-            _client.admin.command('ping'),
-            timeout=5.0
-        )
-        print(f"✅ MongoDB连接成功: {settings.DATABASE_NAME}")
         
-    except asyncio.TimeoutError:
-        print(f"❌ MongoDB连接超时")
-        _client = None
-        _db = None
-        raise Exception("数据库连接超时")
-    except Exception as e:
-        print(f"❌ MongoDB连接失败: {type(e).__name__}: {e}")
-        _client = None
-        _db = None
-        raise
-    finally:
-        _initializing = False
+        try:
+            # 创建新连接
+            _client = _create_client()
+            _db = _client[settings.DATABASE_NAME]
+            
+            # 后台创建索引，不阻塞首个请求
+            global _index_task
+            _index_task = asyncio.get_running_loop().create_task(_ensure_indexes(_db))
+            
+            # 不再额外执行ping，连接可用性由首次实际查询验证
+            # 集群不可达时会在 serverSelectionTimeoutMS 后抛出异常
+            print(f"✅ MongoDB客户端已初始化: {settings.DATABASE_NAME}")
+            
+        except Exception as e:
+            print(f"❌ MongoDB连接失败: {type(e).__name__}: {e}")
+            _client = None
+            _db = None
+            raise
     
     return _db
 
@@ -128,21 +168,35 @@ def get_database():
     if _db is None:
         # 快速初始化（不进行连接测试）
         if _client is None:
-            _client = AsyncIOMotorClient(
-                settings.DATABASE_URL,
-                maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
-                minPoolSize=settings.MONGO_MIN_POOL_SIZE,
-                serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
-                connectTimeoutMS=10000,
-                socketTimeoutMS=10000,
-                retryWrites=True,
-            )
+            _client = _create_client()
             _db = _client[settings.DATABASE_NAME]
             print(f"⚠️  数据库同步初始化: {settings.DATABASE_NAME}")
     
     return _db
 
 
+def get_collection(db, name: str):
+    """
+    获取集合句柄（带缓存）
+    数据库实例变化（如重新连接）时自动丢弃旧的句柄
+    
+    Args:
+        db: 数据库实例
+        name: 集合名称，见 Collections
+    """
+    global _collections_db
+    
+    if db is not _collections_db:
+        _collections.clear()
+        _collections_db = db
+    
+    collection = _collections.get(name)
+    if collection is None:
+        collection = _collections[name] = db[name]
+    
+    return collection
+
+
 # 集合名称常量
 class Collections:
     """MongoDB集合名称"""
@@ -152,3 +206,23 @@ class Collections:
     ISPEAK_TAGS = "kkapi_ispeak_tag_list"
     POSTS = "Post"
 
+
+# 需要创建的索引：(集合名称, 索引键, 额外参数)
+_INDEXES = [
+    # ISpeak按作者分页、按创建时间倒序，_id用于游标翻页时的同时间排序
+    (Collections.ISPEAK, [("author", 1), ("createdAt", -1), ("_id", -1)], {}),
+    # 管理接口不限作者时按创建时间倒序分页
+    (Collections.ISPEAK, [("createdAt", -1)], {}),
+    # 同一用户的标签名、Token标题不能重复，由数据库保证唯一
+    (Collections.ISPEAK_TAGS, [("user", 1), ("name", 1)], {"unique": True}),
+    # 标签按用户分页、按orderNo排序
+    (Collections.ISPEAK_TAGS, [("user", 1), ("orderNo", 1)], {}),
+    (Collections.TOKENS, [("user", 1), ("title", 1)], {"unique": True}),
+    # 通过Token值验证身份（addByToken）
+    (Collections.TOKENS, [("value", 1)], {}),
+    # Post列表按创建时间倒序，增量读取新Post
+    (Collections.POSTS, [("createdAt", -1)], {}),
+    # 登录按用户名查询，GitHub登录按githubId查询
+    (Collections.USERS, [("userName", 1)], {"unique": True}),
+    (Collections.USERS, [("githubId", 1)], {}),
+]
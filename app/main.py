@@ -4,10 +4,20 @@ FastAPI主入口文件
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.core.config import settings
+from app.core.http import close_http_client
+from app.core.responses import ORJSONResponse
 from app.routers import user, token, ispeak, ispeak_tag, post, openapi
 
+# 使用uvloop替换默认的asyncio事件循环（非Linux/macOS或未安装时忽略）
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 
 # 在Serverless环境中，不使用lifespan钩子
 # 改用惰性初始化策略，让数据库连接在首次请求时自动建立
@@ -15,17 +25,42 @@ app = FastAPI(
     title="KKAPI",
     description="KKAPI服务 - FastAPI版本",
     version="0.0.1",
+    default_response_class=ORJSONResponse,
 )
 
+# 进程退出时关闭共享的HTTP客户端（不涉及启动阶段，不影响冷启动）
+app.add_event_handler("shutdown", close_http_client)
+
 # CORS配置
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # 生产环境建议配置具体域名
+    allow_origins=settings.CORS_ORIGINS,  # 生产环境建议配置具体域名
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request, exc: StarletteHTTPException):
+    """
+    统一HTTP异常响应格式，与 ErrorResponse 结构一致
+    直接构造字典，无需经过Pydantic模型校验
+    """
+    headers = dict(exc.headers) if exc.headers else {}
+    headers["Cache-Control"] = "no-store"
+    
+    return ORJSONResponse(
+        {
+            "code": -exc.status_code,
+            "message": exc.detail,
+            "type": "error",
+            "data": None
+        },
+        status_code=exc.status_code,
+        headers=headers
+    )
+
+
 # 注册路由
 app.include_router(user.router, prefix="/api")
 app.include_router(token.router, prefix="/api")
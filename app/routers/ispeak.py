@@ -4,7 +4,7 @@ ISpeak路由
 from fastapi import APIRouter, Depends, Query, Body, Path, HTTPException, status
 from typing import Optional
 
-from app.core.dependencies import get_current_user, get_current_user_optional, get_db
+from app.core.dependencies import AuthContext, auth_and_db, get_current_user_optional, get_db
 from app.schemas.response import SuccessResponse
 from app.schemas.ispeak import (
     IspeakCreate, IspeakCreateByToken, IspeakUpdate, IspeakStatusUpdate
@@ -20,6 +20,7 @@ async def get_ispeak_by_page(
     author: str = Query(..., description="作者ID"),
     page: int = Query(1, ge=1, description="页码"),
     pageSize: int = Query(10, ge=1, le=100, description="每页数量"),
+    after: Optional[str] = Query(None, description="上一页返回的nextCursor，提供时忽略page"),
     current_user: Optional[dict] = Depends(get_current_user_optional),
     db = Depends(get_db)
 ):
@@ -27,14 +28,18 @@ async def get_ispeak_by_page(
     分页获取ISpeak（公开接口，带可见性控制）
     可选认证
     """
-    result = await IspeakService.get_by_page(
-        db,
-        author,
-        page,
-        pageSize,
-        current_user
-    )
-    return SuccessResponse.create(data=result)
+    try:
+        result = await IspeakService.get_by_page(
+            db,
+            author,
+            page,
+            pageSize,
+            current_user,
+            after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return SuccessResponse.render(data=result)
 
 
 @router.get("/getByPage", response_model=SuccessResponse)
@@ -42,13 +47,13 @@ async def get_ispeak_by_page_admin(
     page: int = Query(..., ge=1, description="页码"),
     pageSize: int = Query(..., ge=1, le=100, description="每页数量"),
     author: Optional[str] = Query(None, description="作者ID"),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     分页获取ISpeak（管理接口）
     需要JWT认证
     """
+    current_user, db = auth
     # 如果没有提供author，使用当前用户
     author_id = author or current_user["userId"]
     
@@ -58,19 +63,19 @@ async def get_ispeak_by_page_admin(
         pageSize,
         author_id
     )
-    return SuccessResponse.create(data=result)
+    return SuccessResponse.render(data=result)
 
 
 @router.post("/add", response_model=SuccessResponse)
 async def add_ispeak(
     ispeak_data: IspeakCreate = Body(...),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     添加ISpeak
     需要JWT认证
     """
+    current_user, db = auth
     try:
         ispeak = await IspeakService.add_one(
             db,
@@ -127,13 +132,13 @@ async def add_ispeak_by_token(
 @router.patch("/update", response_model=SuccessResponse)
 async def update_ispeak(
     ispeak_data: IspeakUpdate = Body(...),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     更新ISpeak
     需要JWT认证，只能更新自己的ISpeak
     """
+    current_user, db = auth
     try:
         # 提取要更新的字段
         update_dict = ispeak_data.model_dump(exclude_unset=True, exclude={"id"})
@@ -164,13 +169,13 @@ async def update_ispeak(
 @router.patch("/status/", response_model=SuccessResponse)
 async def update_ispeak_status(
     status_data: IspeakStatusUpdate = Body(...),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     更新ISpeak评论状态
     需要JWT认证
     """
+    current_user, db = auth
     result = await IspeakService.update_status(
         db,
         status_data.id,
@@ -189,13 +194,13 @@ async def update_ispeak_status(
 @router.delete("/{id}", response_model=SuccessResponse)
 async def delete_ispeak(
     id: str = Path(..., description="ISpeak ID"),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     删除ISpeak
     需要JWT认证，只能删除自己的ISpeak
     """
+    current_user, db = auth
     result = await IspeakService.delete_one(db, id, current_user["userId"])
     
     if result["deletedCount"] == 0:
@@ -4,7 +4,7 @@ ISpeak标签路由
 from fastapi import APIRouter, Depends, Query, Body, HTTPException, status
 from typing import Optional
 
-from app.core.dependencies import get_current_user, get_current_user_optional, get_db
+from app.core.dependencies import AuthContext, auth_and_db, get_current_user_optional, get_db
 from app.schemas.response import SuccessResponse
 from app.schemas.ispeak_tag import IspeakTagCreate, IspeakTagUpdate
 from app.services.ispeak_tag_service import IspeakTagService
@@ -50,32 +50,32 @@ async def get_tag_list(
 async def get_tags_by_page(
     page: int = Query(1, ge=1, description="页码"),
     pageSize: int = Query(10, ge=1, le=100, description="每页数量"),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     分页获取标签
     需要JWT认证
     """
+    current_user, db = auth
     result = await IspeakTagService.get_by_page(
         db,
         current_user["userId"],
         page,
         pageSize
     )
-    return SuccessResponse.create(data=result)
+    return SuccessResponse.render(data=result)
 
 
 @router.post("/add", response_model=SuccessResponse)
 async def add_tag(
     tag_data: IspeakTagCreate = Body(...),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     添加标签
     需要JWT认证
     """
+    current_user, db = auth
     try:
         tag = await IspeakTagService.add_one(
             db,
@@ -93,13 +93,13 @@ async def add_tag(
 @router.post("/update", response_model=SuccessResponse)
 async def update_tag(
     tag_data: IspeakTagUpdate = Body(...),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     更新标签
     需要JWT认证
     """
+    current_user, db = auth
     try:
         # 提取要更新的字段
         update_dict = tag_data.model_dump(exclude_unset=True, exclude={"id"})
@@ -109,19 +109,18 @@ async def update_tag(
         
         tag_id = tag_data.id
         
-        result = await IspeakTagService.update_one(
+        tag = await IspeakTagService.find_one_and_update(
             db,
             tag_id,
             current_user["userId"],
             update_dict
         )
         
-        if result["matchedCount"] == 0:
+        # updatedAt每次都会变化，只需区分是否找到
+        if tag is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="标签不存在或无权限修改")
-        elif result["modifiedCount"] == 0:
-            return SuccessResponse.create(data=result, message="没有修改任何内容")
-        else:
-            return SuccessResponse.create(data=result, message="更新成功")
+        
+        return SuccessResponse.create(data=tag, message="更新成功")
     
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -1,7 +1,7 @@
 """
 开放API路由
 """
-from fastapi import APIRouter, Query, Body, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Query, Body, HTTPException, status
 from typing import Optional
 
 from app.schemas.response import SuccessResponse
@@ -32,32 +32,48 @@ notice_router = APIRouter(prefix="/open/notice", tags=["通知"])
 
 @notice_router.get("/", response_model=SuccessResponse)
 async def send_notice_get(
+    background_tasks: BackgroundTasks,
     type: str = Query(..., description="通知类型"),
     token: str = Query(..., description="平台token"),
     content: str = Query(..., description="消息内容"),
-    title: Optional[str] = Query(None, description="消息标题")
+    title: Optional[str] = Query(None, description="消息标题"),
+    sync: bool = Query(False, description="是否等待推送平台返回结果")
 ):
     """
     发送通知（GET方式）
+    默认在响应返回后发送，sync=true时等待推送结果
     """
-    result = await NoticeService.send_notice(type, token, content, title)
-    return SuccessResponse.create(data=result)
+    if sync:
+        result = await NoticeService.send_notice(type, token, content, title)
+        return SuccessResponse.create(data=result)
+    
+    background_tasks.add_task(NoticeService.send_notice, type, token, content, title)
+    return SuccessResponse.create(data={"queued": True})
 
 
 @notice_router.post("/", response_model=SuccessResponse)
 async def send_notice_post(
-    notice_params: NoticeParams = Body(...)
+    background_tasks: BackgroundTasks,
+    notice_params: NoticeParams = Body(...),
+    sync: bool = Query(False, description="是否等待推送平台返回结果")
 ):
     """
     发送通知（POST方式）
+    默认在响应返回后发送，sync=true时等待推送结果
     """
-    result = await NoticeService.send_notice(
+    args = (
         notice_params.type.value,
         notice_params.token,
         notice_params.content,
         notice_params.title
     )
-    return SuccessResponse.create(data=result)
+    
+    if sync:
+        result = await NoticeService.send_notice(*args)
+        return SuccessResponse.create(data=result)
+    
+    background_tasks.add_task(NoticeService.send_notice, *args)
+    return SuccessResponse.create(data={"queued": True})
 
 
 # QQ
@@ -3,8 +3,10 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
 from typing import Optional
+import asyncio
+import logging
 
-from app.core.dependencies import get_current_user, get_db
+from app.core.dependencies import AuthContext, auth_and_db, get_current_user, get_db
 from app.core.security import hash_password, verify_password
 from app.core.config import settings
 from app.schemas.response import SuccessResponse
@@ -17,18 +19,25 @@ from app.services.auth_service import AuthService
 
 router = APIRouter(prefix="/user", tags=["用户管理"])
 
+logger = logging.getLogger(__name__)
+
 
 @router.get("/", response_model=SuccessResponse)
 async def get_user_list(
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    fields: Optional[str] = Query(None, description="只返回的字段，逗号分隔，如 userName,nickName,status"),
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     获取用户列表
     需要JWT认证
     """
-    users = await UserService.find_all(db)
-    return SuccessResponse.create(data=users)
+    current_user, db = auth
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    try:
+        users = UserService.find_all(db, fields=field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return await SuccessResponse.stream(users)
 
 
 @router.get("/id", response_model=SuccessResponse)
@@ -55,8 +64,7 @@ async def init_user(
     只有系统中不存在用户时才能执行
     """
     # 检查是否已存在用户
-    user_count = await UserService.count_users(db)
-    if user_count > 0:
+    if await UserService.has_users(db):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="存在用户，初始化失败")
     
     # 创建初始用户
@@ -74,11 +82,9 @@ async def login(
     返回JWT Token
     """
     try:
-        print(f"📝 收到登录请求: username={credentials.username}")
-        
         # 验证数据库连接
         if db is None:
-            print("❌ 数据库未初始化")
+            logger.error("数据库未初始化")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="数据库服务不可用"
@@ -93,14 +99,13 @@ async def login(
             )
         
         # 创建Token
-        token = AuthService.create_token(user)
-        
-        print(f"✅ 用户登录成功: {credentials.username}")
+        user_id = str(user["_id"])
+        token = AuthService.create_token(user, user_id)
         
         return SuccessResponse.create(
             data=UserLoginResponse(
                 token=token,
-                userId=str(user["_id"]),
+                userId=user_id,
                 userName=user["userName"]
             ),
             message="登录成功"
@@ -111,9 +116,7 @@ async def login(
         raise
     except Exception as e:
         # 捕获所有其他异常
-        print(f"❌ 登录处理异常: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("登录处理异常: %s", credentials.username)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"登录处理失败: {str(e)}"
@@ -122,13 +125,13 @@ async def login(
 
 @router.get("/getUserInfo", response_model=SuccessResponse)
 async def get_user_info(
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     获取当前用户信息
     需要JWT认证
     """
+    current_user, db = auth
     user = await UserService.find_by_id(db, current_user["userId"])
     if not user:
         raise HTTPException(
@@ -145,58 +148,63 @@ async def get_user_info(
 @router.patch("/update", response_model=SuccessResponse)
 async def update_user_info(
     user_data: UserUpdate = Body(...),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     更新用户信息
     需要JWT认证
     """
+    current_user, db = auth
     # 只更新提供的字段
     update_dict = user_data.model_dump(exclude_unset=True)
     
     if not update_dict:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="没有提供任何更新字段")
     
-    result = await UserService.update_one(
-        db, 
-        current_user["userId"], 
-        update_dict
-    )
+    try:
+        user = await UserService.find_one_and_update(
+            db, 
+            current_user["userId"], 
+            update_dict
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    if result["matchedCount"] == 0:
+    # updatedAt每次都会变化，只需区分是否找到
+    if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="没有找到对应用户")
-    elif result["modifiedCount"] == 0:
-        return SuccessResponse.create(data=result, message="没有修改任何内容")
-    else:
-        return SuccessResponse.create(data=result, message="更新成功")
+    
+    if "githubId" in update_dict or "userName" in update_dict:
+        AuthService.clear_github_user_cache()
+    
+    return SuccessResponse.create(data=user, message="更新成功")
 
 
 @router.patch("/password", response_model=SuccessResponse)
 async def change_password(
     password_data: UserChangePassword = Body(...),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    auth: AuthContext = Depends(auth_and_db)
 ):
     """
     修改密码
     需要JWT认证
     """
+    current_user, db = auth
     # 验证两次密码是否一致
     if password_data.password != password_data.rpassword:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="两次密码不一致")
     
     # 获取用户信息（包含密码）
-    user = await UserService.find_by_id(db, current_user["userId"], include_password=True)
+    user = await UserService.find_by_id_with_password(db, current_user["userId"])
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在")
     
     # 验证旧密码
-    if not verify_password(password_data.oldPassword, user["password"]):
+    if not await asyncio.to_thread(verify_password, password_data.oldPassword, user["password"]):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="旧密码不正确")
     
     # 加密新密码并更新
-    hashed_password = hash_password(password_data.password)
+    hashed_password = await asyncio.to_thread(hash_password, password_data.password)
     result = await UserService.update_password(db, current_user["userId"], hashed_password)
     
     if result["modifiedCount"] == 1:
@@ -214,8 +222,8 @@ async def github_oauth(
     GitHub OAuth登录（无需认证）
     """
     # 从配置中获取GitHub OAuth配置
-    github_client_id = getattr(settings, 'GITHUB_CLIENT_ID', '')
-    github_client_secret = getattr(settings, 'GITHUB_CLIENT_SECRET', '')
+    github_client_id = settings.GITHUB_CLIENT_ID
+    github_client_secret = settings.GITHUB_CLIENT_SECRET
     
     if not github_client_id or not github_client_secret:
         raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="GitHub OAuth未配置")
@@ -2,7 +2,7 @@
 ISpeak相关的Pydantic模型
 """
 from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 
@@ -34,8 +34,7 @@ class IspeakUpdate(BaseModel):
     tag: Optional[str] = None
     showComment: Optional[str] = None
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class IspeakStatusUpdate(BaseModel):
@@ -43,8 +42,7 @@ class IspeakStatusUpdate(BaseModel):
     id: str = Field(..., alias="_id", description="ISpeak ID")
     showComment: str = Field(..., description="是否可评论")
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class IspeakAuthor(BaseModel):
@@ -59,8 +57,7 @@ class IspeakTag(BaseModel):
     name: str
     bgColor: str
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class IspeakInDB(IspeakBase):
@@ -71,8 +68,7 @@ class IspeakInDB(IspeakBase):
     createdAt: Optional[datetime] = None
     updatedAt: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True, defer_build=True)
 
 
 class IspeakPublicResponse(BaseModel):
@@ -87,6 +83,5 @@ class IspeakPublicResponse(BaseModel):
     createdAt: Optional[datetime] = None
     updatedAt: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
@@ -2,7 +2,7 @@
 ISpeak标签相关的Pydantic模型
 """
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 
@@ -27,8 +27,7 @@ class IspeakTagUpdate(BaseModel):
     orderNo: Optional[int] = None
     description: Optional[str] = None
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class IspeakTagInDB(IspeakTagBase):
@@ -38,8 +37,7 @@ class IspeakTagInDB(IspeakTagBase):
     createdAt: Optional[datetime] = None
     updatedAt: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True, defer_build=True)
 
 
 class IspeakTagResponse(IspeakTagInDB):
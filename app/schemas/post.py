@@ -2,7 +2,7 @@
 Post朋友圈相关的Pydantic模型
 """
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 
@@ -27,8 +27,7 @@ class PostInDB(PostBase):
     id: str = Field(..., alias="_id")
     createdAt: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True, defer_build=True)
 
 
 class PostResponse(PostInDB):
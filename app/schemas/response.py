@@ -1,11 +1,17 @@
 """
 统一响应模型
 """
-from typing import Any, Literal, Generic, TypeVar
-from pydantic import BaseModel, Field
+from typing import Any, AsyncIterator, Literal, Generic, TypeVar
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.core.responses import ORJSONResponse, dumps
 
 T = TypeVar('T')
 
+# 流式响应每次写出的条数
+_STREAM_CHUNK_ITEMS = 100
+
 
 class ResponseModel(BaseModel, Generic[T]):
     """基础响应模型"""
@@ -17,6 +23,8 @@ class ResponseModel(BaseModel, Generic[T]):
 
 class SuccessResponse(BaseModel, Generic[T]):
     """成功响应"""
+    model_config = ConfigDict(arbitrary_types_allowed=True, validate_assignment=False)
+    
     code: int = Field(0, description="响应码，0表示成功")
     message: str = Field("请求成功", description="响应消息")
     type: Literal["success"] = "success"
@@ -24,8 +32,47 @@ class SuccessResponse(BaseModel, Generic[T]):
     
     @classmethod
     def create(cls, data: T, message: str = "请求成功"):
-        """快速创建成功响应"""
-        return cls(data=data, message=message)
+        """快速创建成功响应（数据由服务端生成，跳过校验）"""
+        return cls.model_construct(data=data, message=message)
+    
+    @classmethod
+    def render(cls, data: Any, message: str = "请求成功") -> ORJSONResponse:
+        """
+        直接生成成功响应的JSON
+        跳过模型构造和FastAPI的response_model校验，适用于服务端生成的可信数据
+        """
+        return ORJSONResponse({
+            "code": 0,
+            "message": message,
+            "type": "success",
+            "data": data
+        })
+    
+    @classmethod
+    async def stream(cls, items: AsyncIterator[Any], message: str = "请求成功") -> Any:
+        """
+        以流的方式生成成功响应的JSON，data为数组
+        逐条序列化写出，无需先把全部数据读入内存；
+        发送响应头之前先读取第一条，查询出错时仍能返回正常的错误响应
+        """
+        try:
+            first = await items.__anext__()
+        except StopAsyncIteration:
+            return cls.render(data=[], message=message)
+        
+        head = b'{"code":0,"message":' + dumps(message) + b',"type":"success","data":['
+        
+        async def body():
+            chunk = [head, dumps(first)]
+            async for item in items:
+                chunk.append(b"," + dumps(item))
+                if len(chunk) >= _STREAM_CHUNK_ITEMS:
+                    yield b"".join(chunk)
+                    chunk = []
+            chunk.append(b"]}")
+            yield b"".join(chunk)
+        
+        return StreamingResponse(body(), media_type="application/json")
 
 
 class ErrorResponse(BaseModel):
@@ -48,5 +95,6 @@ class PaginationResponse(BaseModel, Generic[T]):
     
     @classmethod
     def create(cls, total: int, items: list[T]):
-        return cls(total=total, items=items)
+        """快速创建分页响应（跳过校验）"""
+        return cls.model_construct(total=total, items=items)
 
@@ -2,7 +2,7 @@
 Token相关的Pydantic模型
 """
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 
@@ -23,8 +23,7 @@ class TokenUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=100)
     value: Optional[str] = Field(None, min_length=1)
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class TokenInDB(TokenBase):
@@ -34,8 +33,7 @@ class TokenInDB(TokenBase):
     createdAt: Optional[datetime] = None
     updatedAt: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True, defer_build=True)
 
 
 class TokenResponse(TokenInDB):
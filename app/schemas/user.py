@@ -2,7 +2,7 @@
 用户相关的Pydantic模型
 """
 from typing import Optional
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, EmailStr
 from datetime import datetime
 
 
@@ -64,8 +64,7 @@ class UserInfoResponse(UserBase):
     createdAt: Optional[datetime] = None
     updatedAt: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class UserInDB(UserBase):
@@ -76,6 +75,5 @@ class UserInDB(UserBase):
     createdAt: Optional[datetime] = None
     updatedAt: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True, defer_build=True)
 
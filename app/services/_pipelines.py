@@ -0,0 +1,141 @@
+"""
+聚合管道构建
+统一生成ISpeak分页查询的管道，保证 $match/$sort/分页 始终位于 $lookup 之前
+"""
+from typing import List, Dict, Any
+
+from app.database import Collections
+
+# ISpeak文档需要返回的字段
+_ISPEAK_FIELDS = {
+    "_id": 1,
+    "title": 1,
+    "content": 1,
+    "type": 1,
+    "showComment": 1,
+    "createdAt": 1,
+    "updatedAt": 1,
+    "author": 1,
+    "tag": 1,
+}
+
+# ISpeak文档中的ObjectId字段，在聚合管道中转换为字符串
+_ID_FIELDS_TO_STRING = {
+    "_id": {"$toString": "$_id"},
+    "author": {"$toString": "$author"},
+    "tag": {"$toString": "$tag"},
+}
+
+# 关联作者信息，只取展示需要的字段
+_LOOKUP_AUTHOR = {
+    "$lookup": {
+        "from": Collections.USERS,
+        "localField": "author",
+        "foreignField": "_id",
+        "pipeline": [
+            {"$project": {"_id": {"$toString": "$_id"}, "nickName": 1, "avatar": 1}}
+        ],
+        "as": "authorInfo"
+    }
+}
+
+# 关联标签信息，只取展示需要的字段
+_LOOKUP_TAG = {
+    "$lookup": {
+        "from": Collections.ISPEAK_TAGS,
+        "localField": "tag",
+        "foreignField": "_id",
+        "pipeline": [
+            {"$project": {"_id": {"$toString": "$_id"}, "name": 1, "bgColor": 1}}
+        ],
+        "as": "tagInfo"
+    }
+}
+
+# 公开接口：作者信息替换author字段，标签由调用方从缓存的标签列表中补全
+_PUBLIC_SHAPE = {
+    "$project": {
+        "_id": {"$toString": "$_id"},
+        "title": 1,
+        "content": 1,
+        "type": 1,
+        "showComment": 1,
+        "createdAt": 1,
+        "updatedAt": 1,
+        "author": {"$ifNull": [{"$arrayElemAt": ["$authorInfo", 0]}, {}]},
+        "tag": {"$toString": "$tag"}
+    }
+}
+
+# 管理接口：保留ID字段，关联结果放在authorInfo/tagInfo中
+_ADMIN_SHAPE = {
+    "$set": {
+        **_ID_FIELDS_TO_STRING,
+        "authorInfo": {"$arrayElemAt": ["$authorInfo", 0]},
+        "tagInfo": {"$arrayElemAt": ["$tagInfo", 0]}
+    }
+}
+
+
+def build_ispeak_pipeline(
+    match: Dict[str, Any],
+    sort: Dict[str, int],
+    limit: int,
+    skip: int = 0,
+    with_total: bool = True,
+    lookup_tag: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    构建ISpeak分页查询的聚合管道
+    阶段顺序固定为 $match → $sort → $skip → $limit → $project → $lookup → 整形，
+    只对当前页的文档做关联
+    
+    Args:
+        match: 查询条件
+        sort: 排序条件
+        limit: 每页数量
+        skip: 跳过的文档数，游标翻页时为0
+        with_total: 是否通过$facet同时返回总数，仅用于有索引覆盖排序的查询（$count会读取全部匹配文档）
+        lookup_tag: 是否关联标签（管理接口），否则按公开接口的格式返回
+    
+    Returns:
+        聚合管道；with_total为True时结果为单个 {items, total} 文档
+    """
+    page: List[Dict[str, Any]] = []
+    if skip:
+        page.append({"$skip": skip})
+    page.append({"$limit": limit})
+    
+    # 关联前先裁剪字段，减少参与关联的文档大小
+    page.append({"$project": _ISPEAK_FIELDS})
+    page.append(_LOOKUP_AUTHOR)
+    if lookup_tag:
+        page.append(_LOOKUP_TAG)
+    # 关联结果为1:1，直接取数组第一个元素（无需$unwind）
+    page.append(_ADMIN_SHAPE if lookup_tag else _PUBLIC_SHAPE)
+    
+    pipeline: List[Dict[str, Any]] = [{"$match": match}, {"$sort": sort}]
+    if with_total:
+        # 总数只经过$match，不参与分页和关联
+        pipeline.append({"$facet": {"items": page, "total": [{"$count": "count"}]}})
+    else:
+        pipeline.extend(page)
+    
+    return pipeline
+
+
+def read_facet(result: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    读取build_ispeak_pipeline(with_total=True)的聚合结果
+    
+    Args:
+        result: 聚合结果列表
+    
+    Returns:
+        {total: 总数, items: 文档列表}
+    """
+    facet = result[0]
+    return {
+        "total": facet["total"][0]["count"] if facet["total"] else 0,
+        "items": facet["items"]
+    }
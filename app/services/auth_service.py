@@ -3,10 +3,19 @@
 处理用户认证相关的业务逻辑
 """
 from typing import Optional, Dict, Any
-import httpx
+import asyncio
+import logging
 
-from app.core.security import verify_password, create_access_token
+from app.core.http import get_http_client
+from app.core.security import verify_password_and_update, create_access_token
 from app.services.user_service import UserService
+from app.utils.cache import TTLCache
+
+# githubId -> 用户（仅_id和userName），减少重复OAuth登录时的数据库查询
+# 只缓存已绑定的用户，未绑定时每次都查库，保证新绑定立即生效
+_github_user_cache = TTLCache(maxsize=256, ttl=60)
+
+logger = logging.getLogger(__name__)
 
 
 class AuthService:
@@ -32,51 +41,62 @@ class AuthService:
         try:
             # 验证输入参数
             if not username or not password:
-                print(f"❌ 登录验证失败: 用户名或密码为空")
+                logger.debug("登录验证失败: 用户名或密码为空")
                 return None
             
-            print(f"🔍 正在验证用户: {username}")
-            
             # 查询用户（需要密码字段）
-            user = await UserService.find_one(
-                db, 
-                {"userName": username}, 
-                include_password=True
-            )
+            user = await UserService.find_one_with_password(db, {"userName": username})
             
             if not user:
-                print(f"❌ 用户不存在: {username}")
+                logger.debug("用户不存在: %s", username)
                 return None
             
-            print(f"✅ 找到用户: {username}, 正在验证密码...")
-            
-            # 验证密码
-            if not verify_password(password, user.get("password", "")):
-                print(f"❌ 密码验证失败: {username}")
+            # 验证密码（bcrypt为CPU密集型，放到线程中执行以免阻塞事件循环）
+            matched, new_hash = await asyncio.to_thread(
+                verify_password_and_update, password, user.get("password", "")
+            )
+            if not matched:
+                logger.debug("密码验证失败: %s", username)
                 return None
             
-            print(f"✅ 用户验证成功: {username}")
+            # 旧格式哈希验证通过后升级为新格式，之后的登录不再走兼容校验
+            if new_hash:
+                try:
+                    await UserService.update_password(db, user["_id"], new_hash)
+                    logger.info("已升级用户密码哈希: %s", username)
+                except Exception:
+                    # 升级失败不影响本次登录，下次登录时会重试
+                    logger.exception("升级用户密码哈希失败: %s", username)
+            
+            logger.debug("用户验证成功: %s", username)
             return user
             
-        except Exception as e:
-            print(f"❌ 用户验证异常: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("用户验证异常: %s", username)
             return None
     
     @staticmethod
-    def create_token(user: Dict[str, Any]) -> str:
+    def clear_github_user_cache():
+        """
+        清空githubId缓存
+        用户修改githubId或userName后调用
+        """
+        _github_user_cache.clear()
+    
+    @staticmethod
+    def create_token(user: Dict[str, Any], user_id: Optional[str] = None) -> str:
         """
         为用户创建JWT Token
         
         Args:
             user: 用户信息，必须包含_id和userName
+            user_id: 已转换好的用户ID字符串，不提供则由user["_id"]转换
         
         Returns:
             JWT Token字符串
         """
         token_data = {
-            "userId": str(user["_id"]),
+            "userId": user_id if user_id is not None else str(user["_id"]),
             "userName": user["userName"]
         }
         
@@ -113,53 +133,61 @@ class AuthService:
                 "code": code
             }
             
-            async with httpx.AsyncClient() as client:
-                token_response = await client.post(
-                    token_url,
-                    params=token_params,
-                    headers={"Accept": "application/json"}
-                )
-                token_data = token_response.json()
-                
-                if "access_token" not in token_data:
-                    return None
-                
-                access_token = token_data["access_token"]
-                
-                # 2. 使用access_token获取GitHub用户信息
-                user_url = "https://api.github.com/user"
-                user_response = await client.get(
-                    user_url,
-                    headers={
-                        "Authorization": f"Bearer {access_token}",
-                        "Accept": "application/json"
-                    }
-                )
-                github_user = user_response.json()
-                
-                if "id" not in github_user:
-                    return None
-                
-                github_id = str(github_user["id"])
-                
-                # 3. 根据githubId查找本地用户
+            client = get_http_client()
+            token_response = await client.post(
+                token_url,
+                params=token_params,
+                headers={"Accept": "application/json"}
+            )
+            token_data = token_response.json()
+            
+            if "access_token" not in token_data:
+                return None
+            
+            access_token = token_data["access_token"]
+            
+            # 2. 使用access_token获取GitHub用户信息
+            user_url = "https://api.github.com/user"
+            user_response = await client.get(
+                user_url,
+                headers={
+                    "Authorization": f"Bearer {access_token}",
+                    "Accept": "application/json"
+                }
+            )
+            github_user = user_response.json()
+            
+            if "id" not in github_user:
+                return None
+            
+            github_id = str(github_user["id"])
+            
+            # 3. 根据githubId查找本地用户（优先读取缓存）
+            user = _github_user_cache.get(github_id)
+            if user is None:
                 user = await UserService.find_one(
                     db,
                     {"githubId": github_id}
                 )
-                
-                # 4. 如果找到用户，生成JWT；否则返回userId为'0'
                 if user:
-                    token = AuthService.create_token(user)
-                    return {
-                        "token": token,
-                        "userId": str(user["_id"])
-                    }
-                else:
-                    return {
-                        "token": "",
-                        "userId": "0"
-                    }
+                    _github_user_cache.set(github_id, {
+                        "_id": str(user["_id"]),
+                        "userName": user["userName"]
+                    })
+            
+            # 4. 如果找到用户，生成JWT；否则返回userId为'0'
+            if user:
+                user_id = str(user["_id"])
+                token = AuthService.create_token(user, user_id)
+                return {
+                    "token": token,
+                    "userId": user_id
+                }
+            else:
+                return {
+                    "token": "",
+                    "userId": "0"
+                }
         
         except Exception as e:
             print(f"GitHub OAuth登录失败: {str(e)}")
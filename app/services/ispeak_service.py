@@ -4,9 +4,97 @@ ISpeak服务
 """
 from typing import Optional, List, Dict, Any
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import asyncio
 
-from app.database import Collections
+from app.database import Collections, get_collection
+from app.utils.objectid import is_valid_object_id, to_object_id
+from app.services.ispeak_tag_service import IspeakTagService
+from app.services._pipelines import build_ispeak_pipeline, read_facet
+from app.utils.cache import TTLCache
+
+# 集合名称
+_ISPEAK = Collections.ISPEAK
+
+# 不可见内容的替换文本
+_HIDDEN_LOGIN_REQUIRED = "该内容需登录后查看"
+_HIDDEN_AUTHOR_ONLY = "该内容仅作者可见"
+
+# 下一页预取：(author, page, page_size, user_id) -> asyncio.Task
+# 预取结果只使用一次，任何ISpeak写操作都会清空
+_page_prefetch = TTLCache(maxsize=256, ttl=30)
+
+
+def clear_page_prefetch():
+    """
+    清空下一页预取结果
+    预取页中包含ISpeak内容和标签信息，ISpeak或标签发生写操作时调用
+    """
+    _page_prefetch.clear()
+
+
+def _consume_task_exception(task: asyncio.Task):
+    """取出预取任务的异常，避免未被使用时产生 "exception was never retrieved" 警告"""
+    if not task.cancelled():
+        task.exception()
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# 公开接口排序：createdAt相同时按_id排序，保证游标翻页顺序稳定
+_PUBLIC_SORT = {"createdAt": -1, "_id": -1}
+
+
+def _encode_cursor(item: Dict[str, Any]) -> Optional[str]:
+    """
+    由一条ISpeak生成翻页游标，格式为 "<createdAt毫秒时间戳>_<_id>"
+    
+    Args:
+        item: ISpeak文档
+    
+    Returns:
+        游标字符串，文档缺少createdAt（如历史数据）时返回None
+    """
+    created_at = item.get("createdAt")
+    if not isinstance(created_at, datetime):
+        return None
+    if created_at.tzinfo is None:
+        # 数据库读出的时间为naive UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    millis = (created_at - _EPOCH) // timedelta(milliseconds=1)
+    return f"{millis}_{item['_id']}"
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    解析翻页游标，返回定位到游标之后数据的查询条件
+    
+    Args:
+        cursor: _encode_cursor生成的游标
+    
+    Returns:
+        $match查询条件
+    
+    Raises:
+        ValueError: 游标格式错误
+    """
+    millis, _, oid = cursor.partition("_")
+    # isdigit对全角等非ASCII数字也返回True，需先限定为ASCII
+    if not millis.isascii() or not millis.lstrip("-").isdigit() or not is_valid_object_id(oid):
+        raise ValueError("无效的游标")
+    
+    # BSON日期精度为毫秒，用整数毫秒还原可以与数据库中的值精确比较
+    try:
+        created_at = _EPOCH + timedelta(milliseconds=int(millis))
+    except (OverflowError, ValueError):
+        # 超出datetime可表示范围
+        raise ValueError("无效的游标") from None
+    return {
+        "$or": [
+            {"createdAt": {"$lt": created_at}},
+            {"createdAt": created_at, "_id": {"$lt": ObjectId(oid)}}
+        ]
+    }
 
 
 class IspeakService:
@@ -32,27 +120,30 @@ class IspeakService:
             处理后的ISpeak项
         """
         item_type = item.get("type", "0")
-        author_id = str(item.get("author", {}).get("_id", "")) if isinstance(item.get("author"), dict) else str(item.get("author", ""))
         
-        # type=0: 所有人可见，不做处理
+        # type=0: 所有人可见，不做处理（最常见的情况，最先返回）
         if item_type == "0":
             return item
         
-        # type=1: 需要登录
+        # type=1: 需要登录，未登录时隐藏内容
         if item_type == "1":
             if not current_user_id:
-                # 未登录，隐藏内容
-                item["content"] = "该内容需登录后查看"
+                item["content"] = _HIDDEN_LOGIN_REQUIRED
                 item["title"] = ""
             return item
         
-        # type=2: 仅作者可见
+        # type=2: 仅作者可见，不是作者时隐藏内容
         if item_type == "2":
-            if not current_user_id or current_user_id != author_id:
-                # 不是作者，隐藏内容
-                item["content"] = "该内容仅作者可见"
+            if not current_user_id:
+                hidden = True
+            else:
+                author = item.get("author")
+                author_id = author.get("_id", "") if isinstance(author, dict) else author
+                hidden = current_user_id != str(author_id)
+            
+            if hidden:
+                item["content"] = _HIDDEN_AUTHOR_ONLY
                 item["title"] = ""
-            return item
         
         return item
     
@@ -62,108 +153,179 @@ class IspeakService:
         author: str,
         page: int = 1,
         page_size: int = 10,
-        current_user: Optional[Dict[str, Any]] = None
+        current_user: Optional[Dict[str, Any]] = None,
+        after: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         分页获取ISpeak（公开接口，带可见性控制）
+        提供after游标时按游标翻页，查询代价与页码无关；
+        否则按页码分页，返回当前页后在后台预取下一页，翻页时直接使用预取结果
         
         Args:
             db: 数据库连接
             author: 作者ID
-            page: 页码
+            page: 页码（提供after时忽略）
             page_size: 每页数量
             current_user: 当前用户信息（可选）
+            after: 上一页返回的nextCursor（可选）
         
         Returns:
-            {total: 总数, items: ISpeak列表, isLogin: 用户ID或null}
+            {total: 总数, items: ISpeak列表, isLogin: 用户ID或null, nextCursor: 下一页游标或null}
+        
+        Raises:
+            ValueError: 游标格式错误
         """
-        query = {"author": ObjectId(author)}
         current_user_id = current_user.get("userId") if current_user else None
         
-        # 计算总数
-        total = await db[Collections.ISPEAK].count_documents(query)
+        if after:
+            return await IspeakService._query_after(db, author, after, page_size, current_user_id)
+        
+        # 优先使用预取结果（可见性与登录用户相关，用户ID也是缓存键的一部分）
+        result = None
+        task = _page_prefetch.pop((author, page, page_size, current_user_id))
+        if task is not None:
+            try:
+                result = await task
+            except Exception:
+                result = None
+        
+        if result is None:
+            result = await IspeakService._query_page(db, author, page, page_size, current_user_id)
+        
+        # 存在下一页时预取
+        if page * page_size < result["total"]:
+            next_key = (author, page + 1, page_size, current_user_id)
+            if _page_prefetch.get(next_key) is None:
+                next_task = asyncio.create_task(
+                    IspeakService._query_page(db, author, page + 1, page_size, current_user_id)
+                )
+                next_task.add_done_callback(_consume_task_exception)
+                _page_prefetch.set(next_key, next_task)
+        
+        return result
+    
+    @staticmethod
+    async def _query_page(
+        db,
+        author: str,
+        page: int,
+        page_size: int,
+        current_user_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        查询一页ISpeak并应用可见性规则
         
-        # 分页查询，使用聚合管道关联author和tag
-        skip = (page - 1) * page_size
-        pipeline = [
-            {"$match": query},
-            {"$sort": {"createdAt": -1}},  # 按创建时间倒序
-            {"$skip": skip},
-            {"$limit": page_size},
-            # 关联作者信息
-            {
-                "$lookup": {
-                    "from": Collections.USERS,
-                    "localField": "author",
-                    "foreignField": "_id",
-                    "as": "authorInfo"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$authorInfo",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
-            # 关联标签信息
-            {
-                "$lookup": {
-                    "from": Collections.ISPEAK_TAGS,
-                    "localField": "tag",
-                    "foreignField": "_id",
-                    "as": "tagInfo"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$tagInfo",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
-            # 投影字段
-            {
-                "$project": {
-                    "_id": 1,
-                    "title": 1,
-                    "content": 1,
-                    "type": 1,
-                    "showComment": 1,
-                    "createdAt": 1,
-                    "updatedAt": 1,
-                    "author": {
-                        "_id": "$authorInfo._id",
-                        "nickName": "$authorInfo.nickName",
-                        "avatar": "$authorInfo.avatar"
-                    },
-                    "tag": {
-                        "_id": "$tagInfo._id",
-                        "name": "$tagInfo.name",
-                        "bgColor": "$tagInfo.bgColor"
-                    }
-                }
-            }
-        ]
+        Args:
+            db: 数据库连接
+            author: 作者ID
+            page: 页码
+            page_size: 每页数量
+            current_user_id: 当前用户ID（可选）
         
-        cursor = db[Collections.ISPEAK].aggregate(pipeline)
-        items = await cursor.to_list(length=page_size)
+        Returns:
+            {total: 总数, items: ISpeak列表, isLogin: 用户ID或null}
+        """
+        query = {"author": to_object_id(author)}
         
-        # 处理可见性和ID转换
-        processed_items = []
+        pipeline = build_ispeak_pipeline(
+            query,
+            _PUBLIC_SORT,
+            page_size,
+            skip=(page - 1) * page_size
+        )
+        
+        # 总数与分页数据在一次聚合中返回，同时获取作者的标签列表
+        result, tags = await asyncio.gather(
+            get_collection(db, _ISPEAK).aggregate(pipeline).to_list(length=1),
+            IspeakTagService.get_list(db, author)
+        )
+        page_data = read_facet(result)
+        
+        return IspeakService._build_page(page_data["items"], tags, page_data["total"], page_size, current_user_id)
+    
+    @staticmethod
+    async def _query_after(
+        db,
+        author: str,
+        after: str,
+        page_size: int,
+        current_user_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        按游标查询下一页ISpeak并应用可见性规则
+        通过 (createdAt, _id) 定位起点，无需$skip跳过前面的文档
+        
+        Args:
+            db: 数据库连接
+            author: 作者ID
+            after: 上一页返回的nextCursor
+            page_size: 每页数量
+            current_user_id: 当前用户ID（可选）
+        
+        Returns:
+            {total: 总数, items: ISpeak列表, isLogin: 用户ID或null, nextCursor: 下一页游标或null}
+        
+        Raises:
+            ValueError: 游标格式错误
+        """
+        query = {"author": to_object_id(author)}
+        pipeline = build_ispeak_pipeline(
+            {**query, **_decode_cursor(after)},
+            _PUBLIC_SORT,
+            page_size,
+            with_total=False
+        )
+        
+        collection = get_collection(db, _ISPEAK)
+        items, total, tags = await asyncio.gather(
+            collection.aggregate(pipeline).to_list(length=page_size),
+            collection.count_documents(query),
+            IspeakTagService.get_list(db, author)
+        )
+        
+        return IspeakService._build_page(items, tags, total, page_size, current_user_id)
+    
+    @staticmethod
+    def _build_page(
+        items: List[Dict[str, Any]],
+        tags: List[Dict[str, Any]],
+        total: int,
+        page_size: int,
+        current_user_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        补全标签、应用可见性规则并生成下一页游标
+        
+        Args:
+            items: 当前页ISpeak列表
+            tags: 作者的标签列表
+            total: 总数
+            page_size: 每页数量
+            current_user_id: 当前用户ID（可选）
+        
+        Returns:
+            {total: 总数, items: ISpeak列表, isLogin: 用户ID或null, nextCursor: 下一页游标或null}
+        """
+        tag_map = {
+            tag["_id"]: {k: tag[k] for k in ("_id", "name", "bgColor") if k in tag}
+            for tag in tags
+        }
+        # 不满一页说明已是最后一页，不再返回游标
+        next_cursor = _encode_cursor(items[-1]) if len(items) == page_size else None
+        
+        # 补全标签并处理可见性（原地修改，ID均已在数据库端转换为字符串）
+        process_visibility = IspeakService._process_visibility
         for item in items:
-            item["_id"] = str(item["_id"])
-            if item.get("author") and item["author"].get("_id"):
-                item["author"]["_id"] = str(item["author"]["_id"])
-            if item.get("tag") and item["tag"].get("_id"):
-                item["tag"]["_id"] = str(item["tag"]["_id"])
+            item["tag"] = tag_map.get(item["tag"], {})
             
             # 应用可见性规则
-            item = IspeakService._process_visibility(item, current_user_id)
-            processed_items.append(item)
+            process_visibility(item, current_user_id)
         
         return {
             "total": total,
-            "items": processed_items,
-            "isLogin": current_user_id
+            "items": items,
+            "isLogin": current_user_id,
+            "nextCursor": next_cursor
         }
     
     @staticmethod
@@ -189,67 +351,34 @@ class IspeakService:
         """
         query = query_params or {}
         if author:
-            query["author"] = ObjectId(author)
+            query["author"] = to_object_id(author)
         
-        # 计算总数
-        total = await db[Collections.ISPEAK].count_documents(query)
-        
-        # 分页查询
         skip = (page - 1) * page_size
-        pipeline = [
-            {"$match": query},
-            {"$sort": {"createdAt": -1}},
-            {"$skip": skip},
-            {"$limit": page_size},
-            # 关联作者信息
-            {
-                "$lookup": {
-                    "from": Collections.USERS,
-                    "localField": "author",
-                    "foreignField": "_id",
-                    "as": "authorInfo"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$authorInfo",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
-            # 关联标签信息
-            {
-                "$lookup": {
-                    "from": Collections.ISPEAK_TAGS,
-                    "localField": "tag",
-                    "foreignField": "_id",
-                    "as": "tagInfo"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$tagInfo",
-                    "preserveNullAndEmptyArrays": True
-                }
-            }
-        ]
-        
-        cursor = db[Collections.ISPEAK].aggregate(pipeline)
-        items = await cursor.to_list(length=page_size)
+        collection = get_collection(db, _ISPEAK)
         
-        # 转换ObjectId为字符串
-        for item in items:
-            item["_id"] = str(item["_id"])
-            item["author"] = str(item["author"])
-            item["tag"] = str(item["tag"])
-            if "authorInfo" in item and item["authorInfo"]:
-                item["authorInfo"]["_id"] = str(item["authorInfo"]["_id"])
-            if "tagInfo" in item and item["tagInfo"]:
-                item["tagInfo"]["_id"] = str(item["tagInfo"]["_id"])
+        if author:
+            # 按作者查询时(author, createdAt, _id)索引覆盖排序，总数与分页数据在一次聚合中返回
+            pipeline = build_ispeak_pipeline(query, {"createdAt": -1}, page_size, skip=skip, lookup_tag=True)
+            result = await collection.aggregate(pipeline).to_list(length=1)
+            return read_facet(result)
+        
+        # 不限作者时$facet中的$count会让$sort读取并排序全部文档，
+        # 改为按createdAt索引直接分页，总数单独统计
+        pipeline = build_ispeak_pipeline(
+            query,
+            {"createdAt": -1},
+            page_size,
+            skip=skip,
+            with_total=False,
+            lookup_tag=True
+        )
+        count = collection.count_documents(query) if query else collection.estimated_document_count()
+        items, total = await asyncio.gather(
+            collection.aggregate(pipeline).to_list(length=page_size),
+            count
+        )
         
-        return {
-            "total": total,
-            "items": items
-        }
+        return {"total": total, "items": items}
     
     @staticmethod
     async def add_one(
@@ -277,21 +406,25 @@ class IspeakService:
             创建的ISpeak信息
         """
         # 验证tag_id是否有效
-        if not ObjectId.is_valid(tag_id):
+        if not is_valid_object_id(tag_id):
             raise ValueError("无效的标签ID")
         
+        # 同一次写入使用同一个时间戳
+        now = datetime.now(timezone.utc)
+        
         ispeak_data = {
             "title": title,
             "content": content,
             "type": ispeak_type,
-            "tag": ObjectId(tag_id),
+            "tag": to_object_id(tag_id),
             "showComment": show_comment,
-            "author": ObjectId(author_id),
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow()
+            "author": to_object_id(author_id),
+            "createdAt": now,
+            "updatedAt": now
         }
         
-        result = await db[Collections.ISPEAK].insert_one(ispeak_data)
+        result = await get_collection(db, _ISPEAK).insert_one(ispeak_data)
+        clear_page_prefetch()
         
         return {
             "_id": str(result.inserted_id),
@@ -326,21 +459,22 @@ class IspeakService:
         """
         # 如果更新tag，需要转换为ObjectId
         if "tag" in update_data and update_data["tag"]:
-            if not ObjectId.is_valid(update_data["tag"]):
+            if not is_valid_object_id(update_data["tag"]):
                 raise ValueError("无效的标签ID")
-            update_data["tag"] = ObjectId(update_data["tag"])
+            update_data["tag"] = to_object_id(update_data["tag"])
         
         # 添加更新时间
-        update_data["updatedAt"] = datetime.utcnow()
+        update_data["updatedAt"] = datetime.now(timezone.utc)
         
         # 只能更新自己的ISpeak
-        result = await db[Collections.ISPEAK].update_one(
+        result = await get_collection(db, _ISPEAK).update_one(
             {
                 "_id": ObjectId(ispeak_id),
-                "author": ObjectId(author_id)
+                "author": to_object_id(author_id)
             },
             {"$set": update_data}
         )
+        clear_page_prefetch()
         
         return {
             "acknowledged": result.acknowledged,
@@ -367,18 +501,19 @@ class IspeakService:
         Returns:
             更新结果
         """
-        result = await db[Collections.ISPEAK].update_one(
+        result = await get_collection(db, _ISPEAK).update_one(
             {
                 "_id": ObjectId(ispeak_id),
-                "author": ObjectId(author_id)
+                "author": to_object_id(author_id)
             },
             {
                 "$set": {
                     "showComment": show_comment,
-                    "updatedAt": datetime.utcnow()
+                    "updatedAt": datetime.now(timezone.utc)
                 }
             }
         )
+        clear_page_prefetch()
         
         return {
             "acknowledged": result.acknowledged,
@@ -399,10 +534,11 @@ class IspeakService:
         Returns:
             删除结果
         """
-        result = await db[Collections.ISPEAK].delete_one({
+        result = await get_collection(db, _ISPEAK).delete_one({
             "_id": ObjectId(ispeak_id),
-            "author": ObjectId(author_id)
+            "author": to_object_id(author_id)
         })
+        clear_page_prefetch()
         
         return {
             "acknowledged": result.acknowledged,
@@ -421,7 +557,7 @@ class IspeakService:
         Returns:
             ISpeak信息，不存在返回None
         """
-        ispeak = await db[Collections.ISPEAK].find_one({"_id": ObjectId(ispeak_id)})
+        ispeak = await get_collection(db, _ISPEAK).find_one({"_id": ObjectId(ispeak_id)})
         
         if ispeak:
             ispeak["_id"] = str(ispeak["_id"])
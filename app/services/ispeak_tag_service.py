@@ -4,9 +4,28 @@ ISpeak标签服务
 """
 from typing import Optional, List, Dict, Any
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timezone
+import asyncio
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
-from app.database import Collections
+from app.database import Collections, get_collection, unique_index_ready
+from app.utils.objectid import to_object_id
+from app.utils.cache import TTLCache
+
+# 集合名称
+_TAGS = Collections.ISPEAK_TAGS
+
+# 用户标签列表缓存：user_id -> 标签列表
+# 标签很少变动，新增、修改标签时按用户失效
+_tag_list_cache = TTLCache(maxsize=1024, ttl=60)
+
+
+def _clear_page_prefetch():
+    """清空ISpeak分页预取结果，避免预取页中的标签信息过期"""
+    # 延迟导入：ispeak_service依赖本模块
+    from app.services.ispeak_service import clear_page_prefetch
+    clear_page_prefetch()
 
 
 class IspeakTagService:
@@ -24,16 +43,26 @@ class IspeakTagService:
         Returns:
             标签列表
         """
-        cursor = db[Collections.ISPEAK_TAGS].find(
-            {"user": ObjectId(user_id)}
-        ).sort("orderNo", 1)  # 按orderNo升序排序
+        tags = _tag_list_cache.get(user_id)
+        if tags is not None:
+            # 返回副本，避免调用方修改缓存中的数据
+            return [dict(tag) for tag in tags]
+        
+        pipeline = [
+            {"$match": {"user": to_object_id(user_id)}},
+            {"$sort": {"orderNo": 1}},  # 按orderNo升序排序
+            # 在数据库端将ObjectId转换为字符串
+            {
+                "$addFields": {
+                    "_id": {"$toString": "$_id"},
+                    "user": {"$toString": "$user"}
+                }
+            }
+        ]
         
-        tags = await cursor.to_list(length=None)
+        tags = await get_collection(db, _TAGS).aggregate(pipeline).to_list(length=None)
         
-        # 转换ObjectId为字符串
-        for tag in tags:
-            tag["_id"] = str(tag["_id"])
-            tag["user"] = str(tag["user"])
+        _tag_list_cache.set(user_id, [dict(tag) for tag in tags])
         
         return tags
     
@@ -56,15 +85,16 @@ class IspeakTagService:
         Returns:
             {total: 总数, items: 标签列表}
         """
-        query = {"user": ObjectId(user_id)}
-        
-        # 计算总数
-        total = await db[Collections.ISPEAK_TAGS].count_documents(query)
+        query = {"user": to_object_id(user_id)}
+        collection = get_collection(db, _TAGS)
         
-        # 分页查询
+        # 分页查询与总数统计并发执行
         skip = (page - 1) * page_size
-        cursor = db[Collections.ISPEAK_TAGS].find(query).sort("orderNo", 1).skip(skip).limit(page_size)
-        items = await cursor.to_list(length=page_size)
+        cursor = collection.find(query).sort("orderNo", 1).skip(skip).limit(page_size)
+        items, total = await asyncio.gather(
+            cursor.to_list(length=page_size),
+            collection.count_documents(query)
+        )
         
         # 转换ObjectId为字符串
         for item in items:
@@ -79,7 +109,8 @@ class IspeakTagService:
     @staticmethod
     async def find_one(
         db, 
-        query: Dict[str, Any]
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         根据条件查询单个标签
@@ -87,11 +118,12 @@ class IspeakTagService:
         Args:
             db: 数据库连接
             query: 查询条件
+            projection: 返回字段，不提供则返回完整文档
         
         Returns:
             标签信息，不存在返回None
         """
-        tag = await db[Collections.ISPEAK_TAGS].find_one(query)
+        tag = await get_collection(db, _TAGS).find_one(query, projection)
         
         if tag:
             tag["_id"] = str(tag["_id"])
@@ -123,26 +155,34 @@ class IspeakTagService:
         Returns:
             创建的标签信息
         """
-        # 检查标签名是否已存在
-        existing = await db[Collections.ISPEAK_TAGS].find_one({
-            "user": ObjectId(user_id),
-            "name": name
-        })
+        # 唯一索引就绪前（创建中或因已有重复数据失败）先查询判重
+        if not unique_index_ready(_TAGS):
+            existing = await get_collection(db, _TAGS).find_one(
+                {"user": to_object_id(user_id), "name": name},
+                {"_id": 1}
+            )
+            if existing:
+                raise ValueError(f"标签名 '{name}' 已存在")
         
-        if existing:
-            raise ValueError(f"标签名 '{name}' 已存在")
+        now = datetime.now(timezone.utc)
         
         tag_data = {
             "name": name,
             "bgColor": bg_color,
-            "user": ObjectId(user_id),
+            "user": to_object_id(user_id),
             "orderNo": order_no,
             "description": description,
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow()
+            "createdAt": now,
+            "updatedAt": now
         }
         
-        result = await db[Collections.ISPEAK_TAGS].insert_one(tag_data)
+        # 标签名是否重复由唯一索引 (user, name) 保证
+        try:
+            result = await get_collection(db, _TAGS).insert_one(tag_data)
+        except DuplicateKeyError:
+            raise ValueError(f"标签名 '{name}' 已存在")
+        _tag_list_cache.pop(user_id)
+        _clear_page_prefetch()
         
         return {
             "_id": str(result.inserted_id),
@@ -156,14 +196,14 @@ class IspeakTagService:
         }
     
     @staticmethod
-    async def update_one(
+    async def find_one_and_update(
         db, 
         tag_id: str,
         user_id: str,
         update_data: Dict[str, Any]
-    ) -> Any:
+    ) -> Optional[Dict[str, Any]]:
         """
-        更新标签
+        更新标签并返回更新后的文档
         
         Args:
             db: 数据库连接
@@ -172,34 +212,44 @@ class IspeakTagService:
             update_data: 更新的数据
         
         Returns:
-            更新结果
+            更新后的标签信息，不存在或无权限返回None
+        
+        Raises:
+            ValueError: 标签名与该用户的其他标签重复
         """
-        # 如果更新标签名，需要检查是否重复
-        if "name" in update_data:
-            existing = await db[Collections.ISPEAK_TAGS].find_one({
-                "user": ObjectId(user_id),
-                "name": update_data["name"],
-                "_id": {"$ne": ObjectId(tag_id)}
-            })
-            
+        if "name" in update_data and not unique_index_ready(_TAGS):
+            existing = await get_collection(db, _TAGS).find_one(
+                {
+                    "user": to_object_id(user_id),
+                    "name": update_data["name"],
+                    "_id": {"$ne": ObjectId(tag_id)}
+                },
+                {"_id": 1}
+            )
             if existing:
                 raise ValueError(f"标签名 '{update_data['name']}' 已存在")
         
         # 添加更新时间
-        update_data["updatedAt"] = datetime.utcnow()
+        update_data["updatedAt"] = datetime.now(timezone.utc)
+        
+        # 只能更新自己的标签，标签名是否重复由唯一索引保证
+        try:
+            tag = await get_collection(db, _TAGS).find_one_and_update(
+                {
+                    "_id": ObjectId(tag_id),
+                    "user": to_object_id(user_id)
+                },
+                {"$set": update_data},
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise ValueError(f"标签名 '{update_data.get('name')}' 已存在")
+        _tag_list_cache.pop(user_id)
+        _clear_page_prefetch()
         
-        # 只能更新自己的标签
-        result = await db[Collections.ISPEAK_TAGS].update_one(
-            {
-                "_id": ObjectId(tag_id),
-                "user": ObjectId(user_id)
-            },
-            {"$set": update_data}
-        )
+        if tag:
+            tag["_id"] = str(tag["_id"])
+            tag["user"] = str(tag["user"])
         
-        return {
-            "acknowledged": result.acknowledged,
-            "matchedCount": result.matched_count,
-            "modifiedCount": result.modified_count
-        }
+        return tag
 
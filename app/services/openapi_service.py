@@ -3,9 +3,29 @@
 处理通知、GitHub、QQ等功能
 """
 from typing import Dict, Any, Optional
-import httpx
 from fastapi import HTTPException, status
-from fastapi.responses import RedirectResponse, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.core.http import get_http_client
+
+
+async def _stream_get(url: str, default_media_type: str) -> StreamingResponse:
+    """
+    GET请求目标URL并以流的形式转发响应体
+    无需将整个响应读入内存，上游响应在发送完成后关闭
+    
+    Args:
+        url: 目标URL
+        default_media_type: 上游未返回content-type时使用的类型
+    """
+    client = get_http_client()
+    response = await client.send(client.build_request("GET", url), stream=True)
+    return StreamingResponse(
+        response.aiter_bytes(),
+        media_type=response.headers.get("content-type", default_media_type),
+        background=BackgroundTask(response.aclose)
+    )
 
 
 class NoticeService:
@@ -44,12 +64,12 @@ class NoticeService:
         
         # 示例：Server酱推送（需要具体实现）
         if notice_type == "serverchain":
-            # async with httpx.AsyncClient() as client:
-            #     response = await client.post(
-            #         f"https://sctapi.ftqq.com/{token}.send",
-            #         data={"title": title or "通知", "desp": content}
-            #     )
-            #     result = response.json()
+            # client = get_http_client()
+            # response = await client.post(
+            #     f"https://sctapi.ftqq.com/{token}.send",
+            #     data={"title": title or "通知", "desp": content}
+            # )
+            # result = response.json()
             pass
         
         return result
@@ -90,29 +110,29 @@ class GitHubService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=data, headers=headers)
+            client = get_http_client()
+            response = await client.post(url, json=data, headers=headers)
                 
-                # GitHub Dispatch API成功时返回204 No Content
-                if response.status_code == 204:
-                    return {
-                        "success": True,
-                        "message": f"请求成功!请跳转链接查看:https://github.com/{owner}/{repo}/actions",
-                        "headers": {
-                            "x-oauth-scopes": response.headers.get("x-oauth-scopes"),
-                            "x-ratelimit-limit": response.headers.get("x-ratelimit-limit"),
-                            "x-ratelimit-remaining": response.headers.get("x-ratelimit-remaining"),
-                            "x-ratelimit-reset": response.headers.get("x-ratelimit-reset"),
-                            "x-ratelimit-resource": response.headers.get("x-ratelimit-resource"),
-                            "x-ratelimit-used": response.headers.get("x-ratelimit-used")
-                        }
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "message": f"请求失败: {response.status_code}",
-                        "error": response.text
+            # GitHub Dispatch API成功时返回204 No Content
+            if response.status_code == 204:
+                return {
+                    "success": True,
+                    "message": f"请求成功!请跳转链接查看:https://github.com/{owner}/{repo}/actions",
+                    "headers": {
+                        "x-oauth-scopes": response.headers.get("x-oauth-scopes"),
+                        "x-ratelimit-limit": response.headers.get("x-ratelimit-limit"),
+                        "x-ratelimit-remaining": response.headers.get("x-ratelimit-remaining"),
+                        "x-ratelimit-reset": response.headers.get("x-ratelimit-reset"),
+                        "x-ratelimit-resource": response.headers.get("x-ratelimit-resource"),
+                        "x-ratelimit-used": response.headers.get("x-ratelimit-used")
                     }
+                }
+            else:
+                return {
+                    "success": False,
+                    "message": f"请求失败: {response.status_code}",
+                    "error": response.text
+                }
         
         except Exception as e:
             return {
@@ -144,12 +164,7 @@ class QQService:
         else:
             # 代理返回图片
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(avatar_url)
-                    return Response(
-                        content=response.content,
-                        media_type=response.headers.get("content-type", "image/jpeg")
-                    )
+                return await _stream_get(avatar_url, "image/jpeg")
             except Exception as e:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -172,12 +187,7 @@ class HTTPProxyService:
             目标URL的内容
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                return Response(
-                    content=response.content,
-                    media_type=response.headers.get("content-type", "text/html")
-                )
+            return await _stream_get(url, "text/html")
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
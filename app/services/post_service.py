@@ -2,11 +2,39 @@
 Post朋友圈服务
 处理Post相关的业务逻辑
 """
-from typing import List, Dict, Any
+from typing import Optional, List, Dict, Any
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timezone
+import asyncio
+import time
 
-from app.database import Collections
+from app.database import Collections, get_collection
+
+# 集合名称
+_POSTS = Collections.POSTS
+
+# Post列表返回的字段，ObjectId在数据库端转换为字符串
+_POST_FIELDS = {
+    "_id": {"$toString": "$_id"},
+    "title": 1,
+    "link": 1,
+    "author": 1,
+    "avatar": 1,
+    "rule": 1,
+    "updated": 1,
+    "created": 1,
+    "createdAt": 1,
+}
+
+# Post列表缓存（按createdAt倒序）
+# Post只追加不修改：每次只查询水位线之后新增的记录并合并到缓存中，
+# 并定期全量重建，以便感知直接在数据库中做的修改或删除
+_POST_FULL_REFRESH_SECONDS = 300
+_post_cache: List[Dict[str, Any]] = []
+_post_cache_ids: set = set()
+_post_watermark: Optional[datetime] = None
+_post_refreshed_at = 0.0
+_post_lock = asyncio.Lock()
 
 
 class PostService:
@@ -15,22 +43,47 @@ class PostService:
     @staticmethod
     async def find_all(db) -> List[Dict[str, Any]]:
         """
-        查询所有Post
+        查询所有Post（按创建时间倒序）
+        优先使用缓存，只从数据库读取上次查询之后新增的Post
         
         Args:
             db: 数据库连接
         
         Returns:
-            Post列表
+            Post列表，调用方不应修改
         """
-        cursor = db[Collections.POSTS].find({}).sort("createdAt", -1)
-        posts = await cursor.to_list(length=None)
+        global _post_cache, _post_cache_ids, _post_watermark, _post_refreshed_at
         
-        # 转换ObjectId为字符串
-        for post in posts:
-            post["_id"] = str(post["_id"])
-        
-        return posts
+        async with _post_lock:
+            now = time.monotonic()
+            full = _post_watermark is None or now - _post_refreshed_at >= _POST_FULL_REFRESH_SECONDS
+            
+            # 使用$gte而不是$gt：与水位线同一毫秒写入的Post可能在上次查询之后才插入，
+            # 重复读取的记录按_id去重
+            pipeline = [
+                {"$sort": {"createdAt": -1}},
+                {"$project": _POST_FIELDS}
+            ]
+            if not full:
+                pipeline.insert(0, {"$match": {"createdAt": {"$gte": _post_watermark}}})
+            
+            posts = await get_collection(db, _POSTS).aggregate(pipeline).to_list(length=None)
+            
+            if full:
+                _post_cache = posts
+                _post_cache_ids = {post["_id"] for post in posts}
+                _post_refreshed_at = now
+            else:
+                new_posts = [post for post in posts if post["_id"] not in _post_cache_ids]
+                if new_posts:
+                    # 生成新列表而不是原地修改，已返回给调用方的列表不受影响
+                    _post_cache = new_posts + _post_cache
+                    _post_cache_ids.update(post["_id"] for post in new_posts)
+            
+            if _post_cache and _post_cache[0].get("createdAt") is not None:
+                _post_watermark = _post_cache[0]["createdAt"]
+            
+            return _post_cache
     
     @staticmethod
     async def create_one(
@@ -59,18 +112,20 @@ class PostService:
         Returns:
             创建的Post信息
         """
+        now = datetime.now(timezone.utc)
+        
         post_data = {
             "title": title,
             "link": link,
             "author": author,
             "avatar": avatar,
             "rule": rule,
-            "updated": updated or datetime.utcnow(),
-            "created": created or datetime.utcnow(),
-            "createdAt": datetime.utcnow()
+            "updated": updated or now,
+            "created": created or now,
+            "createdAt": now
         }
         
-        result = await db[Collections.POSTS].insert_one(post_data)
+        result = await get_collection(db, _POSTS).insert_one(post_data)
         
         return {
             "_id": str(result.inserted_id),
@@ -4,9 +4,33 @@ Token服务
 """
 from typing import Optional, List, Dict, Any
 from bson import ObjectId
-from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timezone
 
-from app.database import Collections
+from app.database import Collections, get_collection, unique_index_ready
+from app.utils.objectid import to_object_id
+from app.utils.cache import TTLCache
+
+# 集合名称
+_TOKENS = Collections.TOKENS
+
+# Token列表返回的字段，ObjectId在数据库端转换为字符串
+_TOKEN_FIELDS = {
+    "_id": {"$toString": "$_id"},
+    "title": 1,
+    "value": 1,
+    "user": {"$toString": "$user"},
+    "createdAt": 1,
+    "updatedAt": 1,
+}
+
+# 验证Token时只需要的字段
+_VALIDATE_FIELDS = {"_id": 1, "user": 1, "value": 1, "title": 1}
+
+# 验证通过的Token缓存：(title, value) -> Token信息
+# 有效期较短，且任何Token写操作都会清空
+_validate_cache = TTLCache(maxsize=1024, ttl=10)
 
 
 class TokenService:
@@ -24,15 +48,12 @@ class TokenService:
         Returns:
             Token列表
         """
-        cursor = db[Collections.TOKENS].find({"user": ObjectId(user_id)})
-        tokens = await cursor.to_list(length=None)
-        
-        # 转换ObjectId为字符串
-        for token in tokens:
-            token["_id"] = str(token["_id"])
-            token["user"] = str(token["user"])
+        pipeline = [
+            {"$match": {"user": to_object_id(user_id)}},
+            {"$project": _TOKEN_FIELDS}
+        ]
         
-        return tokens
+        return await get_collection(db, _TOKENS).aggregate(pipeline).to_list(length=None)
     
     @staticmethod
     async def get_one(db, token_id: str) -> Optional[Dict[str, Any]]:
@@ -46,7 +67,7 @@ class TokenService:
         Returns:
             Token信息，不存在返回None
         """
-        token = await db[Collections.TOKENS].find_one({"_id": ObjectId(token_id)})
+        token = await get_collection(db, _TOKENS).find_one({"_id": ObjectId(token_id)})
         
         if token:
             token["_id"] = str(token["_id"])
@@ -55,18 +76,23 @@ class TokenService:
         return token
     
     @staticmethod
-    async def find_one(db, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def find_one(
+        db, 
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         根据条件查询单个Token
         
         Args:
             db: 数据库连接
             query: 查询条件
+            projection: 返回字段，不提供则返回完整文档
         
         Returns:
             Token信息，不存在返回None
         """
-        token = await db[Collections.TOKENS].find_one(query)
+        token = await get_collection(db, _TOKENS).find_one(query, projection)
         
         if token:
             token["_id"] = str(token["_id"])
@@ -94,24 +120,31 @@ class TokenService:
         Returns:
             创建的Token信息
         """
-        # 检查是否已存在相同标题的Token
-        existing = await db[Collections.TOKENS].find_one({
-            "user": ObjectId(user_id),
-            "title": title
-        })
+        # 唯一索引就绪前（创建中或因已有重复数据失败）先查询判重
+        if not unique_index_ready(_TOKENS):
+            existing = await get_collection(db, _TOKENS).find_one(
+                {"user": to_object_id(user_id), "title": title},
+                {"_id": 1}
+            )
+            if existing:
+                raise ValueError(f"Token标题 '{title}' 已存在")
         
-        if existing:
-            raise ValueError(f"Token标题 '{title}' 已存在")
+        now = datetime.now(timezone.utc)
         
         token_data = {
             "title": title,
             "value": value,
-            "user": ObjectId(user_id),
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow()
+            "user": to_object_id(user_id),
+            "createdAt": now,
+            "updatedAt": now
         }
         
-        result = await db[Collections.TOKENS].insert_one(token_data)
+        # 标题是否重复由唯一索引 (user, title) 保证
+        try:
+            result = await get_collection(db, _TOKENS).insert_one(token_data)
+        except DuplicateKeyError:
+            raise ValueError(f"Token标题 '{title}' 已存在")
+        _validate_cache.clear()
         
         return {
             "_id": str(result.inserted_id),
@@ -123,14 +156,15 @@ class TokenService:
         }
     
     @staticmethod
-    async def update_one(
+    async def find_one_and_update(
         db, 
         token_id: str, 
         user_id: str,
         update_data: Dict[str, Any]
-    ) -> Any:
+    ) -> Optional[Dict[str, Any]]:
         """
-        更新Token
+        更新Token并返回更新后的文档
+        存在性校验与读取更新结果合并为一次数据库往返
         
         Args:
             db: 数据库连接
@@ -139,25 +173,45 @@ class TokenService:
             update_data: 更新的数据
         
         Returns:
-            更新结果
+            更新后的Token信息，不存在或无权限返回None
+        
+        Raises:
+            ValueError: 标题与该用户的其他Token重复
         """
+        if "title" in update_data and not unique_index_ready(_TOKENS):
+            existing = await get_collection(db, _TOKENS).find_one(
+                {
+                    "user": to_object_id(user_id),
+                    "title": update_data["title"],
+                    "_id": {"$ne": ObjectId(token_id)}
+                },
+                {"_id": 1}
+            )
+            if existing:
+                raise ValueError(f"Token标题 '{update_data['title']}' 已存在")
+        
         # 添加更新时间
-        update_data["updatedAt"] = datetime.utcnow()
+        update_data["updatedAt"] = datetime.now(timezone.utc)
         
         # 只能更新自己的Token
-        result = await db[Collections.TOKENS].update_one(
-            {
-                "_id": ObjectId(token_id),
-                "user": ObjectId(user_id)
-            },
-            {"$set": update_data}
-        )
+        try:
+            token = await get_collection(db, _TOKENS).find_one_and_update(
+                {
+                    "_id": ObjectId(token_id),
+                    "user": to_object_id(user_id)
+                },
+                {"$set": update_data},
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise ValueError(f"Token标题 '{update_data.get('title')}' 已存在")
+        _validate_cache.clear()
         
-        return {
-            "acknowledged": result.acknowledged,
-            "matchedCount": result.matched_count,
-            "modifiedCount": result.modified_count
-        }
+        if token:
+            token["_id"] = str(token["_id"])
+            token["user"] = str(token["user"])
+        
+        return token
     
     @staticmethod
     async def delete_one(db, token_id: str, user_id: str) -> Any:
@@ -173,10 +227,11 @@ class TokenService:
             删除结果
         """
         # 只能删除自己的Token
-        result = await db[Collections.TOKENS].delete_one({
+        result = await get_collection(db, _TOKENS).delete_one({
             "_id": ObjectId(token_id),
-            "user": ObjectId(user_id)
+            "user": to_object_id(user_id)
         })
+        _validate_cache.clear()
         
         return {
             "acknowledged": result.acknowledged,
@@ -200,15 +255,28 @@ class TokenService:
         Returns:
             Token信息（包含user字段），验证失败返回None
         """
-        token = await db[Collections.TOKENS].find_one({
-            "title": title,
-            "value": value
-        })
+        cache_key = (title, value)
+        token = _validate_cache.get(cache_key)
+        if token is not None:
+            return dict(token)
         
-        if token:
-            token["_id"] = str(token["_id"])
-            if isinstance(token["user"], ObjectId):
-                token["user"] = str(token["user"])
+        # value上有索引，Token值熵高，按value即可直接定位到文档
+        token = await get_collection(db, _TOKENS).find_one(
+            {
+                "value": value,
+                "title": title
+            },
+            _VALIDATE_FIELDS
+        )
+        
+        # 查询条件已精确匹配value，无需再次比较
+        if token is None:
+            return None
+        
+        token["_id"] = str(token["_id"])
+        if isinstance(token["user"], ObjectId):
+            token["user"] = str(token["user"])
+        
+        _validate_cache.set(cache_key, dict(token))
         
         return token
-
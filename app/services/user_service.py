@@ -2,73 +2,233 @@
 用户服务
 处理用户相关的业务逻辑
 """
-from typing import Optional, List, Dict, Any
-from bson import ObjectId
-from datetime import datetime
+from typing import Optional, AsyncIterator, List, Dict, Any, Tuple
+from pymongo import ReturnDocument, UpdateOne, WriteConcern
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timezone
+from functools import partial
+import asyncio
+import logging
 
-from app.database import Collections
-from app.core.security import hash_password
+from app.database import Collections, get_collection
+from app.core.security import hash_password, is_password_hash
+from app.utils.objectid import to_object_id
+from app.utils.cache import TTLCache
+
+# 集合名称
+_USERS = Collections.USERS
+
+# 排除密码字段的投影
+_PROJ_NO_PW = {"password": 0}
+
+# 用户列表可以按需返回的字段（UserBase中的公开字段和时间）
+# 不包含password、speakToken等敏感字段
+_USER_LIST_FIELDS = frozenset({
+    "userName",
+    "nickName",
+    "avatar",
+    "desc",
+    "link",
+    "email",
+    "homePath",
+    "status",
+    "githubId",
+    "createdAt",
+    "updatedAt",
+})
+
+# 新用户的默认字段，创建时复制后补充用户名、密码和时间
+_DEFAULT_USER_TEMPLATE = {
+    "nickName": "",
+    "avatar": "",
+    "desc": "",
+    "link": "",
+    "email": "",
+    # 默认密码hash（原始密码为空或默认值）
+    "password": "$2a$10$TVk79hQVVpmfu2BOupaIl.lw80Wlwvnpwl0oOjjLH180fi16F9p0K",
+    "homePath": "/about/index",
+    "status": "0",
+    "speakToken": "",
+    "githubId": "",
+}
+
+# 一旦确认系统中存在用户就不会再变为无用户，缓存该结果以跳过后续查询
+_users_initialized = False
+
+# 用户信息缓存：user_id -> 用户文档（不含密码）
+# 修改用户信息、密码时主动更新或失效
+_user_cache = TTLCache(maxsize=10000, ttl=60)
+
+# 正在进行的用户查询：user_id -> asyncio.Task
+# 同一用户的并发缓存未命中共用一次查询
+_user_inflight: Dict[str, asyncio.Task] = {}
+
+# find_all每批从数据库读取的文档数
+_FIND_ALL_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def _release_inflight(user_id: str, task: asyncio.Task):
+    """查询结束后移除登记（登记已被写操作移除或替换时不处理）"""
+    if _user_inflight.get(user_id) is task:
+        del _user_inflight[user_id]
 
 
 class UserService:
     """用户服务类"""
     
     @staticmethod
-    async def find_all(db, exclude_password: bool = True) -> List[Dict[str, Any]]:
+    def find_all(
+        db,
+        exclude_password: bool = True,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
         """
         查询所有用户
+        逐批从数据库读取并逐条返回，内存占用与用户总数无关
         
         Args:
             db: 数据库连接
             exclude_password: 是否排除密码字段
+            fields: 只返回的字段（须为 _USER_LIST_FIELDS 中的字段，_id总是返回），不提供则返回全部字段
         
         Returns:
-            用户列表
+            用户的异步迭代器
+        
+        Raises:
+            ValueError: fields中包含不允许返回的字段
         """
-        projection = {"password": 0} if exclude_password else None
-        cursor = db[Collections.USERS].find({}, projection)
-        users = await cursor.to_list(length=None)
+        # 在数据库端将ObjectId转换为字符串
+        pipeline = [{"$addFields": {"_id": {"$toString": "$_id"}}}]
+        if fields:
+            # 在开始查询前校验，避免非法字段让聚合在流式输出中途失败
+            invalid = [field for field in fields if field not in _USER_LIST_FIELDS]
+            if invalid:
+                raise ValueError(f"不支持的字段: {', '.join(invalid)}")
+            pipeline.insert(0, {"$project": dict.fromkeys(fields, 1)})
+        elif exclude_password:
+            pipeline.insert(0, {"$project": _PROJ_NO_PW})
         
-        # 转换ObjectId为字符串
-        for user in users:
-            user["_id"] = str(user["_id"])
+        return UserService._iter_users(db, pipeline)
+    
+    @staticmethod
+    async def _iter_users(db, pipeline: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐条返回用户聚合结果
         
-        return users
+        Args:
+            db: 数据库连接
+            pipeline: 聚合管道
+        
+        Returns:
+            用户的异步迭代器
+        """
+        async for user in get_collection(db, _USERS).aggregate(pipeline, batchSize=_FIND_ALL_BATCH_SIZE):
+            yield user
     
     @staticmethod
-    async def find_by_id(
-        db, 
-        user_id: str, 
-        include_password: bool = False
-    ) -> Optional[Dict[str, Any]]:
+    async def find_by_id(db, user_id: str) -> Optional[Dict[str, Any]]:
         """
-        根据ID查询用户
+        根据ID查询用户（不包含密码，优先读取缓存）
         
         Args:
             db: 数据库连接
             user_id: 用户ID
-            include_password: 是否包含密码字段
         
         Returns:
             用户信息，不存在返回None
         """
-        projection = None if include_password else {"password": 0}
+        user = _user_cache.get(user_id)
+        if user is None:
+            task = _user_inflight.get(user_id)
+            if task is None:
+                task = asyncio.create_task(UserService._load_user(db, user_id))
+                _user_inflight[user_id] = task
+                task.add_done_callback(partial(_release_inflight, user_id))
+            # shield：某个等待方被取消时不影响共用查询的其他请求
+            user = await asyncio.shield(task)
+            if user is None:
+                return None
         
-        user = await db[Collections.USERS].find_one(
-            {"_id": ObjectId(user_id)},
-            projection
+        # 返回副本，避免调用方修改缓存中的数据
+        return dict(user)
+    
+    @staticmethod
+    async def find_by_id_with_password(db, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        根据ID查询用户（包含密码，仅用于密码校验）
+        
+        Args:
+            db: 数据库连接
+            user_id: 用户ID
+        
+        Returns:
+            用户信息，不存在返回None
+        """
+        user = await get_collection(db, _USERS).find_one({"_id": to_object_id(user_id)})
+        if user:
+            user["_id"] = str(user["_id"])
+        return user
+    
+    @staticmethod
+    async def _load_user(db, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        从数据库读取用户（不含密码）并写入缓存
+        
+        Args:
+            db: 数据库连接
+            user_id: 用户ID
+        
+        Returns:
+            用户信息，不存在返回None
+        """
+        user = await get_collection(db, _USERS).find_one(
+            {"_id": to_object_id(user_id)},
+            _PROJ_NO_PW
         )
         
         if user:
             user["_id"] = str(user["_id"])
+            # 查询期间用户被修改时（登记已被移除）不写入缓存，避免覆盖新数据
+            if _user_inflight.get(user_id) is asyncio.current_task():
+                _user_cache.set(user_id, user)
         
         return user
     
     @staticmethod
-    async def find_one(
-        db, 
-        query: Dict[str, Any], 
-        include_password: bool = False
+    async def find_one(db, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        根据条件查询单个用户（不包含密码）
+        
+        Args:
+            db: 数据库连接
+            query: 查询条件
+        
+        Returns:
+            用户信息，不存在返回None
+        """
+        return await UserService._find_one(db, query, _PROJ_NO_PW)
+    
+    @staticmethod
+    async def find_one_with_password(db, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        根据条件查询单个用户（包含密码，仅用于登录验证）
+        
+        Args:
+            db: 数据库连接
+            query: 查询条件
+        
+        Returns:
+            用户信息，不存在返回None
+        """
+        return await UserService._find_one(db, query, None)
+    
+    @staticmethod
+    async def _find_one(
+        db,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]]
     ) -> Optional[Dict[str, Any]]:
         """
         根据条件查询单个用户
@@ -76,25 +236,21 @@ class UserService:
         Args:
             db: 数据库连接
             query: 查询条件
-            include_password: 是否包含密码字段
+            projection: 返回字段
         
         Returns:
-            用户信息，不存在返回None
+            用户信息，不存在或查询异常返回None
         """
         try:
-            projection = None if include_password else {"password": 0}
-            
-            user = await db[Collections.USERS].find_one(query, projection)
+            user = await get_collection(db, _USERS).find_one(query, projection)
             
             if user:
                 user["_id"] = str(user["_id"])
             
             return user
             
-        except Exception as e:
-            print(f"❌ 查询用户异常: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("查询用户异常")
             return None
     
     @staticmethod
@@ -109,31 +265,22 @@ class UserService:
         Args:
             db: 数据库连接
             userName: 用户名
-            password: 密码，如果不提供则使用默认密码
+            password: 密码（明文或已加密的bcrypt哈希），如果不提供则使用默认密码
         
         Returns:
             创建的用户信息
         """
-        # 默认密码hash（原始密码为空或默认值）
-        default_password_hash = "$2a$10$TVk79hQVVpmfu2BOupaIl.lw80Wlwvnpwl0oOjjLH180fi16F9p0K"
-        
-        user_data = {
-            "userName": userName,
-            "nickName": "",
-            "avatar": "",
-            "desc": "",
-            "link": "",
-            "email": "",
-            "password": hash_password(password) if password else default_password_hash,
-            "homePath": "/about/index",
-            "status": "0",
-            "speakToken": "",
-            "githubId": "",
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow()
-        }
+        user_data = _DEFAULT_USER_TEMPLATE.copy()
+        user_data["userName"] = userName
+        if password:
+            # 导入已加密的密码时直接使用，避免重复进行bcrypt计算
+            if is_password_hash(password):
+                user_data["password"] = password
+            else:
+                user_data["password"] = await asyncio.to_thread(hash_password, password)
+        user_data["createdAt"] = user_data["updatedAt"] = datetime.now(timezone.utc)
         
-        result = await db[Collections.USERS].insert_one(user_data)
+        result = await get_collection(db, _USERS).insert_one(user_data)
         
         return {
             "_id": str(result.inserted_id),
@@ -141,13 +288,44 @@ class UserService:
         }
     
     @staticmethod
-    async def update_one(
+    async def create_many_unack(db, users: List[Dict[str, Any]]) -> int:
+        """
+        批量创建用户，不等待数据库确认（w=0）
+        仅用于导入、初始化等脚本场景；写入失败不会报错，需要确认写入结果的场景请使用create_one
+        
+        Args:
+            db: 数据库连接
+            users: 用户文档列表，至少包含userName；password须为已加密的hash
+        
+        Returns:
+            提交写入的用户数量
+        """
+        if not users:
+            return 0
+        
+        now = datetime.now(timezone.utc)
+        documents = []
+        for user in users:
+            user_data = _DEFAULT_USER_TEMPLATE.copy()
+            user_data.update(user)
+            user_data.setdefault("createdAt", now)
+            user_data.setdefault("updatedAt", now)
+            documents.append(user_data)
+        
+        collection = get_collection(db, _USERS).with_options(write_concern=WriteConcern(w=0))
+        await collection.insert_many(documents, ordered=False)
+        
+        return len(documents)
+    
+    @staticmethod
+    async def find_one_and_update(
         db, 
         user_id: str, 
         update_data: Dict[str, Any]
-    ) -> Any:
+    ) -> Optional[Dict[str, Any]]:
         """
-        更新用户信息
+        更新用户信息并返回更新后的文档（不包含密码）
+        存在性校验与读取更新结果合并为一次数据库往返
         
         Args:
             db: 数据库连接
@@ -155,15 +333,70 @@ class UserService:
             update_data: 更新的数据
         
         Returns:
-            更新结果
+            更新后的用户信息，用户不存在返回None
+        
+        Raises:
+            ValueError: 用户名与其他用户重复
         """
         # 添加更新时间
-        update_data["updatedAt"] = datetime.utcnow()
+        update_data["updatedAt"] = datetime.now(timezone.utc)
         
-        result = await db[Collections.USERS].update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": update_data}
-        )
+        # 用户名是否重复由唯一索引保证
+        try:
+            user = await get_collection(db, _USERS).find_one_and_update(
+                {"_id": to_object_id(user_id)},
+                {"$set": update_data},
+                projection=_PROJ_NO_PW,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise ValueError("用户名已存在")
+        
+        _user_inflight.pop(user_id, None)
+        if user:
+            user["_id"] = str(user["_id"])
+            _user_cache.set(user_id, dict(user))
+        else:
+            _user_cache.pop(user_id)
+        
+        return user
+    
+    @staticmethod
+    async def bulk_update(
+        db,
+        updates: List[Tuple[str, Dict[str, Any]]]
+    ) -> Any:
+        """
+        批量更新多个用户的信息，一次数据库往返完成
+        
+        Args:
+            db: 数据库连接
+            updates: (用户ID, 更新的数据) 列表
+        
+        Returns:
+            更新结果
+        """
+        if not updates:
+            return {"acknowledged": True, "matchedCount": 0, "modifiedCount": 0}
+        
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne({"_id": to_object_id(user_id)}, {"$set": {**update_data, "updatedAt": now}})
+            for user_id, update_data in updates
+        ]
+        
+        try:
+            result = await get_collection(db, _USERS).bulk_write(operations, ordered=False)
+        finally:
+            # 无序批量写入出错时部分更新可能已生效，无论成功与否都失效缓存
+            for user_id, _ in updates:
+                _user_inflight.pop(user_id, None)
+                _user_cache.pop(user_id)
+            # githubId或userName变化时，OAuth登录的githubId缓存可能指向错误的用户
+            if any("githubId" in update_data or "userName" in update_data for _, update_data in updates):
+                # 延迟导入：auth_service依赖本模块
+                from app.services.auth_service import AuthService
+                AuthService.clear_github_user_cache()
         
         return {
             "acknowledged": result.acknowledged,
@@ -188,13 +421,15 @@ class UserService:
         Returns:
             更新结果
         """
-        result = await db[Collections.USERS].update_one(
-            {"_id": ObjectId(user_id)},
+        result = await get_collection(db, _USERS).update_one(
+            {"_id": to_object_id(user_id)},
             {"$set": {
                 "password": hashed_password,
-                "updatedAt": datetime.utcnow()
+                "updatedAt": datetime.now(timezone.utc)
             }}
         )
+        _user_inflight.pop(user_id, None)
+        _user_cache.pop(user_id)
         
         return {
             "acknowledged": result.acknowledged,
@@ -213,5 +448,39 @@ class UserService:
         Returns:
             用户总数
         """
-        return await db[Collections.USERS].count_documents({})
+        return await get_collection(db, _USERS).count_documents({})
+    
+    @staticmethod
+    async def count_users_fast(db) -> int:
+        """
+        估算用户数量
+        读取集合元数据，不扫描索引；结果可能短暂不准确，适用于统计展示
+        
+        Args:
+            db: 数据库连接
+        
+        Returns:
+            用户总数（估算值）
+        """
+        return await get_collection(db, _USERS).estimated_document_count()
+    
+    @staticmethod
+    async def has_users(db) -> bool:
+        """
+        系统中是否已存在用户
+        只需找到任意一条记录，无需统计总数；确认存在后不再查询数据库
+        
+        Args:
+            db: 数据库连接
+        
+        Returns:
+            是否存在用户
+        """
+        global _users_initialized
+        
+        if not _users_initialized:
+            user = await get_collection(db, _USERS).find_one({}, {"_id": 1})
+            _users_initialized = user is not None
+        
+        return _users_initialized
 
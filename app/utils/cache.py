@@ -0,0 +1,79 @@
+"""
+缓存工具模块
+提供进程内的TTL缓存，适用于Serverless实例内的热点数据复用
+"""
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    带过期时间和容量上限的进程内缓存
+
+    - 每个条目可单独指定过期时间，默认使用 ttl
+    - 容量满时先清理过期条目，仍然不足则淘汰最早写入的条目
+    - 使用线程锁保护写操作，可在线程池中安全使用
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取缓存值，不存在或已过期返回default"""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expire_at, value = entry
+        if expire_at <= time.monotonic():
+            with self._lock:
+                self._data.pop(key, None)
+            return default
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期秒数，不提供则使用默认ttl；小于等于0时不写入
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._evict(now)
+            self._data[key] = (now + ttl, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """删除并返回缓存值"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict(self, now: float) -> None:
+        """清理过期条目，仍然满时淘汰最早写入的条目（调用方需持有锁）"""
+        expired = [k for k, (expire_at, _) in self._data.items() if expire_at <= now]
+        for k in expired:
+            del self._data[k]
+
+        if len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
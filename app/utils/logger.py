@@ -2,57 +2,98 @@
 日志工具模块
 提供统一的日志记录功能
 """
+import atexit
 import logging
+import queue
 import sys
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any
 
+import orjson
+
+
+class _FieldsFormatter(logging.Formatter):
+    """在消息后以JSON附加log_*传入的结构化字段（record.fields）"""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            message = f"{message} - {orjson.dumps(fields, default=str).decode()}"
+        return message
+
+
+# 请求处理线程只把日志记录放入队列，写stdout由后台线程完成，避免阻塞事件循环
+# QueueHandler入队前会先格式化消息（含结构化字段和异常堆栈），输出端只补充时间和级别
+_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+
+_queue_handler = QueueHandler(_queue)
+_queue_handler.setFormatter(_FieldsFormatter('%(message)s'))
+
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+
+_listener = QueueListener(_queue, _stream_handler)
+_listener.start()
+# 进程退出前输出队列中剩余的日志
+atexit.register(_listener.stop)
+
 # 配置日志格式
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
+    handlers=[_queue_handler]
 )
 
 logger = logging.getLogger("ispeake-api")
 
+# 请求/响应日志的消息模板，只在日志实际输出时格式化
+_REQUEST_FMT = "API请求: %s %s"
+_RESPONSE_FMT = "API响应: %s - 状态码: %s"
+_RESPONSE_DURATION_FMT = "API响应: %s - 状态码: %s - 耗时: %sms"
+
 
 def log_info(message: str, **kwargs):
     """记录信息日志"""
-    extra = f" - {kwargs}" if kwargs else ""
-    logger.info(f"{message}{extra}")
+    if not kwargs:
+        logger.info(message)
+        return
+    logger.info(message, extra={"fields": kwargs})
 
 
 def log_error(message: str, error: Exception = None, **kwargs):
     """记录错误日志"""
-    extra = f" - {kwargs}" if kwargs else ""
+    extra = {"fields": kwargs} if kwargs else None
     if error:
-        logger.error(f"{message}: {type(error).__name__}: {error}{extra}", exc_info=True)
+        logger.error("%s: %s: %s", message, type(error).__name__, error, exc_info=True, extra=extra)
     else:
-        logger.error(f"{message}{extra}")
+        logger.error(message, extra=extra)
 
 
 def log_warning(message: str, **kwargs):
     """记录警告日志"""
-    extra = f" - {kwargs}" if kwargs else ""
-    logger.warning(f"{message}{extra}")
+    if not kwargs:
+        logger.warning(message)
+        return
+    logger.warning(message, extra={"fields": kwargs})
 
 
 def log_debug(message: str, **kwargs):
-    """记录调试日志"""
-    extra = f" - {kwargs}" if kwargs else ""
-    logger.debug(f"{message}{extra}")
+    """记录调试日志（消息在日志级别允许输出时才格式化）"""
+    if not kwargs:
+        logger.debug(message)
+        return
+    logger.debug(message, extra={"fields": kwargs})
 
 
 def log_request(endpoint: str, method: str, user: str = "anonymous"):
     """记录API请求"""
-    log_info(f"API请求: {method} {endpoint}", user=user)
+    logger.info(_REQUEST_FMT, method, endpoint, extra={"fields": {"user": user}})
 
 
 def log_response(endpoint: str, status_code: int, duration_ms: float = None):
     """记录API响应"""
-    duration = f" - 耗时: {duration_ms}ms" if duration_ms else ""
-    log_info(f"API响应: {endpoint} - 状态码: {status_code}{duration}")
-
+    if duration_ms:
+        logger.info(_RESPONSE_DURATION_FMT, endpoint, status_code, duration_ms)
+    else:
+        logger.info(_RESPONSE_FMT, endpoint, status_code)
@@ -0,0 +1,44 @@
+"""
+ObjectId工具模块
+提供ObjectId字符串校验与带缓存的转换
+"""
+import re
+from functools import lru_cache
+from typing import Any
+
+from bson import ObjectId
+
+# 24位十六进制字符串
+_OBJECT_ID_MATCH = re.compile(r"[0-9a-fA-F]{24}").fullmatch
+
+
+def is_valid_object_id(value: Any) -> bool:
+    """
+    判断是否为合法的ObjectId字符串
+    
+    Args:
+        value: 待校验的值
+    
+    Returns:
+        是否为24位十六进制字符串
+    """
+    return isinstance(value, str) and _OBJECT_ID_MATCH(value) is not None
+
+
+@lru_cache(maxsize=4096)
+def to_object_id(value: str) -> ObjectId:
+    """
+    将字符串转换为ObjectId（带缓存）
+    适用于用户ID、标签ID等会被反复转换的值；ObjectId不可变，可安全共享
+    单个文档的ID（如ISpeak、Token的ID）请直接使用ObjectId，避免挤占缓存
+    
+    Args:
+        value: ObjectId字符串
+    
+    Returns:
+        ObjectId对象
+    
+    Raises:
+        bson.errors.InvalidId: 字符串不是合法的ObjectId
+    """
+    return ObjectId(value)
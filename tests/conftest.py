@@ -0,0 +1,8 @@
+"""
+测试公共配置
+"""
+import os
+
+# Settings要求的必填配置，需在导入app之前设置
+os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017/ispeak_test")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
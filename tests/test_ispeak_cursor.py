@@ -0,0 +1,41 @@
+"""
+ISpeak翻页游标测试
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pydantic_settings")
+
+from bson import ObjectId  # noqa: E402
+
+from app.services.ispeak_service import _decode_cursor, _encode_cursor  # noqa: E402
+
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123000, tzinfo=timezone.utc)
+    cursor = _encode_cursor({"_id": str(oid), "createdAt": created_at})
+
+    query = _decode_cursor(cursor)
+
+    assert query["$or"][0] == {"createdAt": {"$lt": created_at}}
+    assert query["$or"][1] == {"createdAt": created_at, "_id": {"$lt": oid}}
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "abc",
+    "123",
+    f"12a_{ObjectId()}",
+    "123_not-an-object-id",
+    # 全角数字
+    f"１２３_{ObjectId()}",
+    # 超出datetime范围
+    f"99999999999999999999_{ObjectId()}",
+    f"-99999999999999999999_{ObjectId()}",
+])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match="无效的游标"):
+        _decode_cursor(cursor)
@@ -0,0 +1,45 @@
+"""
+密码校验测试
+"""
+import pytest
+
+bcrypt = pytest.importorskip("bcrypt")
+pytest.importorskip("pydantic_settings")
+
+from app.core.security import (  # noqa: E402
+    hash_password,
+    verify_password,
+    verify_password_and_update,
+)
+
+
+def _legacy_hash(password: str, prefix: str) -> str:
+    """生成NestJS格式（未经SHA256预处理）的旧哈希"""
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=4)).decode("utf-8")
+    return prefix + hashed[4:]
+
+
+@pytest.mark.parametrize("prefix", ["$2a$", "$2b$"])
+def test_legacy_hash_matches_and_is_upgraded(prefix):
+    hashed = _legacy_hash("secret", prefix)
+
+    assert verify_password("secret", hashed)
+    matched, new_hash = verify_password_and_update("secret", hashed)
+    assert matched
+    assert new_hash is not None
+    assert verify_password_and_update("secret", new_hash) == (True, None)
+
+
+@pytest.mark.parametrize("prefix", ["$2a$", "$2b$"])
+def test_legacy_hash_rejects_wrong_password(prefix):
+    hashed = _legacy_hash("secret", prefix)
+
+    assert not verify_password("wrong", hashed)
+    assert verify_password_and_update("wrong", hashed) == (False, None)
+
+
+def test_new_hash_does_not_need_update():
+    hashed = hash_password("secret")
+
+    assert verify_password_and_update("secret", hashed) == (True, None)
+    assert not verify_password("wrong", hashed)